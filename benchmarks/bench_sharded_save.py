@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Sharded Save Benchmark
+Times saving and loading synthetic worlds in the three layouts the server
+can use:
+
+- single    one pretty-printed .tms file, loaded with the streaming reader
+- sharded   manifest plus shards, serialized in this process
+- parallel  manifest plus shards, serialized by the process pool
+
+Saves go through GameServer.save_game, history included. Each layout is
+saved once to start its history, then 1% of the players change and the
+timed save follows, as with a running server's autosaves. "save" is how
+long save_game takes; "history" is how much longer the history thread
+needs to record that save's delta snapshot.
+
+Usage:
+    python benchmarks/bench_sharded_save.py [--sizes 10000,100000,1000000]
+                                            [--shards 8] [--workers N] [--dir PATH]
+
+The 1,000,000-player world needs a few GB of memory. Parallel times only
+improve on single-file ones with more than one core (--workers defaults to
+the number of CPUs).
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_data import STARTING_STATS, WEAPONS, SPELLS, LOCATIONS
+from game_server import GameServer
+from game_log import GameLogger
+from save_manager import SaveManager
+from sharded_save import ShardedSaves
+
+
+def make_players(count):
+    """count players with varied but realistic data."""
+    locations = list(LOCATIONS)
+    weapons = list(WEAPONS)
+    spells = list(SPELLS)
+    players = {}
+    for i in range(count):
+        level = 1 + i % 30
+        players[f"player{i:07d}"] = dict(
+            STARTING_STATS,
+            level=level,
+            exp=i % 50,
+            gold=(i * 7) % 5000,
+            health=100 + level * 20,
+            max_health=100 + level * 20,
+            location=locations[i % len(locations)],
+            weapon=weapons[i % len(weapons)],
+            spells=spells[:i % (len(spells) + 1)],
+            inventory=[],
+        )
+    return players
+
+
+def timed(action):
+    started = time.perf_counter()
+    result = action()
+    return time.perf_counter() - started, result
+
+
+def directory_size(save_path):
+    total = os.path.getsize(save_path)
+    shard_dir = os.path.splitext(save_path)[0] + ".shards"
+    if os.path.isdir(shard_dir):
+        total += sum(os.path.getsize(os.path.join(shard_dir, name)) for name in os.listdir(shard_dir))
+    return total
+
+
+def bench(count, shards, workers, directory):
+    players = make_players(count)
+    server = GameServer(port=0, log=GameLogger(level="error"), install_signal_handlers=False)
+    server.saves_dir = directory
+    server.save_manager = SaveManager(directory)
+    server.players = players
+
+    rows = []
+    layouts = (
+        ("single", 0, ShardedSaves(workers=1)),
+        ("sharded", shards, ShardedSaves(workers=1)),
+        ("parallel", shards, ShardedSaves(workers=workers, parallel_threshold=0)),
+    )
+    for name, shard_count, saves in layouts:
+        server.save_shards = shard_count
+        server.sharded_saves = saves
+        save_file = f"bench_{name}_{count}.tms"
+        server.save_game(save_file)
+        server.save_manager.wait_idle()
+        for username in list(server.players)[::100]:
+            server.players[username]['gold'] += 1
+        save_time, _ = timed(lambda: server.save_game(save_file))
+        history_time, _ = timed(server.save_manager.wait_idle)
+        size = directory_size(os.path.join(directory, save_file))
+        load_time, ok = timed(lambda: server.load_game(save_file))
+        if not ok or len(server.players) != count:
+            raise RuntimeError(f"{name}: loaded {len(server.players)} of {count} players")
+        saves.close()
+        rows.append((name, save_time, history_time, load_time, size))
+    return rows
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sizes = [10000, 100000, 1000000]
+    shards = 8
+    workers = os.cpu_count() or 1
+    directory = None
+    args = iter(argv)
+    try:
+        for arg in args:
+            if arg == "--sizes":
+                sizes = [int(size) for size in next(args).split(",")]
+            elif arg == "--shards":
+                shards = int(next(args))
+            elif arg == "--workers":
+                workers = int(next(args))
+            elif arg == "--dir":
+                directory = next(args)
+            else:
+                raise ValueError(arg)
+    except (StopIteration, ValueError):
+        print(__doc__.strip())
+        return 1
+
+    scratch = directory or tempfile.mkdtemp(prefix="tmgame_bench_")
+    os.makedirs(scratch, exist_ok=True)
+    print(f"{shards} shards, {workers} worker process(es), files in {scratch}")
+    print(f"{'players':>9}  {'layout':<9} {'save (s)':>9} {'history (s)':>12} {'load (s)':>9} {'size (MB)':>10}")
+    try:
+        for count in sizes:
+            for name, save_time, history_time, load_time, size in bench(count, shards, workers, scratch):
+                print(f"{count:>9}  {name:<9} {save_time:>9.3f} {history_time:>12.3f} {load_time:>9.3f} "
+                      f"{size / 1e6:>10.1f}")
+    finally:
+        if directory is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Chat Channel Module
+Tracks who listens to which chat channel (global, per-room, named and
+whispers), applies per-channel rate limits and keeps delivery metrics.
+Message text is encoded once per message and the same bytes are handed to
+every recipient.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+GLOBAL_CHANNEL = "global"
+WHISPER_CHANNEL = "whisper"
+
+# Messages allowed per sender within the window (seconds), per channel kind
+RATE_LIMITS = {
+    "global": (5, 10.0),
+    "room": (10, 10.0),
+    "named": (8, 10.0),
+    "whisper": (10, 10.0),
+}
+
+MAX_CHANNEL_NAME = 20
+
+
+class RateLimited(Exception):
+    """Raised when a sender exceeds a channel's rate limit."""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"rate limited, retry in {retry_after:.1f}s")
+
+
+class Channel:
+    """A set of subscribers plus the channel's rate limit and counters."""
+
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+        self.subscribers = set()
+        self.limit, self.window = RATE_LIMITS[kind]
+        self.recent = {}  # {sender: deque of send times inside the window}
+        self.messages = 0
+        self.deliveries = 0
+        self.bytes_out = 0
+        self.rate_limited = 0
+
+    def check_rate(self, sender, now):
+        """Record a send by sender, or raise RateLimited."""
+        sent = self.recent.get(sender)
+        if sent is None:
+            sent = self.recent[sender] = deque()
+        while sent and now - sent[0] >= self.window:
+            sent.popleft()
+        if len(sent) >= self.limit:
+            self.rate_limited += 1
+            raise RateLimited(self.window - (now - sent[0]))
+        sent.append(now)
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "subscribers": len(self.subscribers),
+            "messages": self.messages,
+            "deliveries": self.deliveries,
+            "bytes_out": self.bytes_out,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def room_channel(location_id):
+    return f"room:{location_id}"
+
+
+class ChatManager:
+    """Channel membership and message fan-out bookkeeping.
+
+    The manager never touches sockets: publish() returns the recipients and
+    the encoded payload, and the server does the sending. It keeps its own
+    lock so chat never contends on the server's game-state lock.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.channels = {
+            GLOBAL_CHANNEL: Channel(GLOBAL_CHANNEL, "global"),
+            WHISPER_CHANNEL: Channel(WHISPER_CHANNEL, "whisper"),
+        }
+        self.memberships = {}  # {username: set of channel names}
+
+    def _subscribe(self, username, name, kind):
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = Channel(name, kind)
+        channel.subscribers.add(username)
+        self.memberships.setdefault(username, set()).add(name)
+
+    def _unsubscribe(self, username, name):
+        channel = self.channels.get(name)
+        if channel is not None:
+            channel.subscribers.discard(username)
+            channel.recent.pop(username, None)
+            # Named channels only exist while someone is listening
+            if not channel.subscribers and channel.kind == "named":
+                del self.channels[name]
+        self.memberships.get(username, set()).discard(name)
+
+    def connect(self, username, location_id):
+        """Subscribe a player who just came online."""
+        with self.lock:
+            self._subscribe(username, GLOBAL_CHANNEL, "global")
+            self._subscribe(username, room_channel(location_id), "room")
+
+    def disconnect(self, username):
+        """Drop every subscription of a player who went offline."""
+        with self.lock:
+            for name in list(self.memberships.get(username, ())):
+                self._unsubscribe(username, name)
+            self.memberships.pop(username, None)
+            # Whisper senders are not subscribers, so forget their sends here
+            self.channels[WHISPER_CHANNEL].recent.pop(username, None)
+
+    def move(self, username, old_location, new_location):
+        """Switch a player's room channel after they change location."""
+        if old_location == new_location:
+            return
+        with self.lock:
+            if username not in self.memberships:
+                return  # Offline players are not subscribed anywhere
+            self._unsubscribe(username, room_channel(old_location))
+            self._subscribe(username, room_channel(new_location), "room")
+
+    def join(self, username, name):
+        """Join (creating if needed) a named channel. Returns False if invalid."""
+        if not name.isalnum() or len(name) > MAX_CHANNEL_NAME:
+            return False
+        with self.lock:
+            existing = self.channels.get(name)
+            if existing is not None and existing.kind != "named":
+                return False
+            self._subscribe(username, name, "named")
+        return True
+
+    def leave(self, username, name):
+        """Leave a named channel. Returns False if not a member."""
+        with self.lock:
+            channel = self.channels.get(name)
+            if channel is None or channel.kind != "named" or username not in channel.subscribers:
+                return False
+            self._unsubscribe(username, name)
+        return True
+
+    def named_channels(self, username):
+        with self.lock:
+            return sorted((name, len(self.channels[name].subscribers))
+                          for name in self.memberships.get(username, ())
+                          if self.channels[name].kind == "named")
+
+    def publish(self, name, sender, text, recipients=None):
+        """Account for a message and encode it once.
+
+        Returns (recipients, payload). recipients defaults to the channel's
+        subscribers; whispers pass their target explicitly. Raises KeyError
+        if the sender is not subscribed and RateLimited when over the limit.
+        """
+        payload = text.encode('utf-8')
+        with self.lock:
+            channel = self.channels.get(name)
+            if channel is None or (recipients is None and sender not in channel.subscribers):
+                raise KeyError(name)
+            channel.check_rate(sender, self.clock())
+            if recipients is None:
+                recipients = list(channel.subscribers)
+            channel.messages += 1
+            channel.deliveries += len(recipients)
+            channel.bytes_out += len(payload) * len(recipients)
+        return recipients, payload
+
+    def export_rates(self, username):
+        """username's recent send times per channel, relative to the clock's reading."""
+        with self.lock:
+            now = self.clock()
+            return {name: [sent - now for sent in channel.recent[username]]
+                    for name, channel in self.channels.items()
+                    if channel.recent.get(username)}
+
+    def restore_rates(self, username, rates):
+        """Give username back the send times export_rates() returned.
+
+        Channels that no longer exist are skipped.
+        """
+        with self.lock:
+            now = self.clock()
+            for name, sent in rates.items():
+                channel = self.channels.get(name)
+                if channel is not None:
+                    channel.recent[username] = deque(now + offset for offset in sent)
+
+    def stats(self):
+        """Per-channel counters, keyed by channel name."""
+        with self.lock:
+            return {name: channel.stats() for name, channel in self.channels.items()}
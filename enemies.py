@@ -0,0 +1,177 @@
+"""
+Enemy Population Module
+The live enemies of the world. Every (location, enemy type) listed in the
+world data is one shared enemy instance: every player in the room fights the
+same one, attacks and spells both wear it down, and once slain it respawns
+after a delay.
+
+Instances live in flat typed arrays indexed by slot number, with a dict from
+(location, enemy type) to slot for O(1) lookup, so thousands of enemies cost
+a few bytes each and a fight allocates nothing. Respawns are driven by a heap
+of (due time, slot) entries processed whenever the table is used.
+"""
+
+import heapq
+import threading
+import time
+from array import array
+
+
+RESPAWN_SECONDS = 30  # Default when an enemy template has no respawn_seconds
+
+
+class EnemyTable:
+    """Health and respawn state for every enemy instance in a world."""
+
+    def __init__(self, world, clock=time.monotonic):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.build(world)
+
+    def build(self, world, previous=None):
+        """Create one slot per (location, enemy type) in world.
+
+        previous maps (location, enemy type) to (health, respawn_at) for
+        instances that should keep their state, e.g. across a reload.
+        """
+        slots = {}
+        keys = []
+        health = array('i')
+        max_health = array('i')
+        respawn_at = array('d')  # 0.0 while alive
+        heap = []
+        for location_id, loc in world.locations.items():
+            for enemy_type in loc['enemies']:
+                if (location_id, enemy_type) in slots:
+                    continue
+                index = len(keys)
+                template = world.enemies[enemy_type]
+                slots[(location_id, enemy_type)] = index
+                keys.append((location_id, enemy_type))
+                current, due = (previous or {}).get((location_id, enemy_type), (template['health'], 0.0))
+                health.append(min(current, template['health']))
+                max_health.append(template['health'])
+                respawn_at.append(due)
+                if due:
+                    heap.append((due, index))
+        heapq.heapify(heap)
+
+        with self.lock:
+            self.world = world
+            self.slots = slots
+            self.keys = keys
+            self.health = health
+            self.max_health = max_health
+            self.respawn_at = respawn_at
+            self.heap = heap
+
+    def rebuild(self, world):
+        """Switch to a reloaded world, keeping instances that still exist."""
+        with self.lock:
+            previous = {key: (self.health[index], self.respawn_at[index])
+                        for key, index in self.slots.items()}
+        self.build(world, previous)
+
+    # Lookups and state changes; callers hold self.lock ------------------------
+
+    def slot(self, location_id, enemy_type):
+        """Slot of an enemy instance, or None if it does not live there."""
+        return self.slots.get((location_id, enemy_type))
+
+    def alive(self, index):
+        return not self.respawn_at[index]
+
+    def first_alive(self, location_id):
+        """Slot of the first living enemy in a location, or None."""
+        for enemy_type in self.world.locations[location_id]['enemies']:
+            index = self.slots[(location_id, enemy_type)]
+            if not self.respawn_at[index]:
+                return index
+        return None
+
+    def damage(self, index, amount):
+        """Apply damage; returns True if this blow slew the enemy."""
+        self.health[index] = max(0, self.health[index] - max(0, amount))
+        if self.health[index] > 0:
+            return False
+        template = self.world.enemies[self.keys[index][1]]
+        due = self.clock() + template.get('respawn_seconds', RESPAWN_SECONDS)
+        self.respawn_at[index] = due
+        heapq.heappush(self.heap, (due, index))
+        return True
+
+    # Scheduler ----------------------------------------------------------------
+
+    def respawn_due(self):
+        """Bring back every enemy whose timer ran out.
+
+        Takes the lock itself. Returns the set of locations that changed.
+        """
+        changed = set()
+        with self.lock:
+            now = self.clock()
+            heap = self.heap
+            while heap and heap[0][0] <= now:
+                due, index = heapq.heappop(heap)
+                if self.respawn_at[index] != due:
+                    continue  # Stale entry from before a rebuild
+                self.respawn_at[index] = 0.0
+                self.health[index] = self.max_health[index]
+                changed.add(self.keys[index][0])
+        return changed
+
+    # Rendering and persistence ---------------------------------------------------
+
+    def describe(self, location_id):
+        """The "[!] Enemies" line for a location ("" if none live there)."""
+        enemy_types = self.world.locations[location_id]['enemies']
+        if not enemy_types:
+            return ""
+        parts = []
+        with self.lock:
+            for enemy_type in enemy_types:
+                index = self.slots[(location_id, enemy_type)]
+                name = self.world.enemies[enemy_type]['name']
+                if self.respawn_at[index]:
+                    parts.append(f"{name} (slain, will return)")
+                else:
+                    parts.append(f"{name} ({self.health[index]}/{self.max_health[index]} HP)")
+        return f"[!] Enemies: {', '.join(parts)}\n"
+
+    def state(self, location_id):
+        """[{"type", "name", "hp", "max_hp", "alive"}, ...] for a location's enemies."""
+        states = []
+        with self.lock:
+            for enemy_type in self.world.locations[location_id]['enemies']:
+                index = self.slots[(location_id, enemy_type)]
+                states.append({"type": enemy_type, "name": self.world.enemies[enemy_type]['name'],
+                               "hp": self.health[index], "max_hp": self.max_health[index],
+                               "alive": not self.respawn_at[index]})
+        return states
+
+    def export(self):
+        """[[location, enemy type, health, seconds until respawn], ...] for damaged or slain enemies."""
+        with self.lock:
+            now = self.clock()
+            return [[location_id, enemy_type, self.health[index],
+                     max(0.001, self.respawn_at[index] - now) if self.respawn_at[index] else 0.0]
+                    for (location_id, enemy_type), index in self.slots.items()
+                    if self.respawn_at[index] or self.health[index] < self.max_health[index]]
+
+    def restore(self, entries):
+        """Apply state produced by export()."""
+        with self.lock:
+            now = self.clock()
+            for location_id, enemy_type, health, respawn_in in entries:
+                index = self.slots.get((location_id, enemy_type))
+                if index is None:
+                    continue
+                self.health[index] = health
+                if respawn_in:
+                    self.respawn_at[index] = now + respawn_in
+                    heapq.heappush(self.heap, (self.respawn_at[index], index))
+                else:
+                    self.respawn_at[index] = 0.0
+
+    def __len__(self):
+        return len(self.keys)
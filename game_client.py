@@ -3,63 +3,362 @@ Terminal Multiplayer Game Client
 Connects to the game server and allows players to interact with the game.
 """
 
+import codecs
+import hashlib
+import json
+import os
+import random
+import selectors
 import socket
-import threading
 import sys
+import threading
+import time
+
+try:
+    import readline  # Lets us redraw a half-typed command after output
+except ImportError:
+    readline = None
+
+
+PROMPT = ">>> "
+USERNAME_PROMPT = "Enter your username: "
+SESSION_PREFIX = "[SESSION] "
+RESUME_TOKEN_PREFIX = "[SESSION] Resume token: "
+RESUME_REJECTED = "[SESSION] Unknown or expired resume token."
+BLOCK_PREFIX = "@@block "
+CACHED_PREFIX = "@@cached "
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".tmgame_cache")
+
+
+class OutputRenderer:
+    """Renders server output line by line while keeping the prompt stable."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+        self.prompt = PROMPT
+
+    def _clear_prompt(self):
+        # Return to column 0 and erase the prompt (and any typed text)
+        self.stream.write("\r\033[K")
+
+    def _draw_prompt(self):
+        self.stream.write(self.prompt)
+        if readline is not None:
+            self.stream.write(readline.get_line_buffer())
+
+    def render(self, lines, partial=""):
+        """Print complete lines, then redraw the prompt once.
+
+        A trailing partial line (such as "Enter your username: ") is shown
+        as the prompt itself until the rest of the line arrives.
+        """
+        with self.lock:
+            self._clear_prompt()
+            if lines:
+                self.stream.write("\n".join(lines) + "\n")
+            self.prompt = partial if partial else PROMPT
+            self._draw_prompt()
+            self.stream.flush()
+
+    def notice(self, message):
+        """Print a client-side notice above the prompt."""
+        self.render([message])
+
+
+class BlockCache:
+    """Static server output (help, shop) kept on disk, keyed by content hash.
+
+    The server sends such blocks in full once, framed as
+    "@@block <key> <hash> <lines>", and afterwards only "@@cached <key> <hash>"
+    while the content is unchanged. One file per server holds the blocks.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.blocks = {}  # {key: (hash, text)}
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+        for key, entry in stored.items() if isinstance(stored, dict) else ():
+            try:
+                digest, text = entry
+            except (TypeError, ValueError):
+                continue
+            if isinstance(text, str) and self.content_hash(text) == digest:
+                self.blocks[key] = (digest, text)
+
+    @staticmethod
+    def content_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+    def announcement(self):
+        """The "@cache" line telling the server which versions we hold."""
+        return " ".join(["@cache"] + [f"{key}={digest}" for key, (digest, _) in self.blocks.items()])
+
+    def lookup(self, key, digest):
+        entry = self.blocks.get(key)
+        if entry is None or entry[0] != digest:
+            return None
+        return entry[1]
+
+    def store(self, key, digest, text):
+        """Keep a block sent in full; False if it does not match its hash."""
+        if self.content_hash(text) != digest:
+            return False
+        self.blocks[key] = (digest, text)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(self.blocks, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # Still cached for this run
+        return True
 
 
 class GameClient:
-    def __init__(self, host='localhost', port=5555):
+    def __init__(self, host='localhost', port=5555, max_backoff=30.0, cache_dir=CACHE_DIR):
         self.host = host
         self.port = port
         self.client = None
         self.running = False
-    
+        self.max_backoff = max_backoff
+        self.renderer = OutputRenderer()
+        self.selector = selectors.DefaultSelector()
+        self.decoder = None
+        self.pending_text = ""
+        self.outgoing = bytearray()
+        self.out_lock = threading.Lock()
+        self.login_line = None  # First line sent, replayed on reconnect
+        self.resume_token = None  # Issued by the server after login
+        self.prompt_answered = False
+        # Static blocks from this server; cache_dir=None turns caching off
+        self.cache = None
+        if cache_dir is not None:
+            server_name = f"{host}_{port}".replace(":", "-").replace(os.sep, "-")
+            self.cache = BlockCache(os.path.join(cache_dir, f"{server_name}.json"))
+        self.block = None  # [key, hash, lines still to come, lines] while a block arrives
+        # Wakes the network loop when the input thread queues a command
+        self.wake_recv, self.wake_send = socket.socketpair()
+        self.wake_recv.setblocking(False)
+        self.selector.register(self.wake_recv, selectors.EVENT_READ, 'wake')
+
     def connect(self):
         """Connect to the game server."""
         try:
-            self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client.connect((self.host, self.port))
-            self.running = True
-            
-            print("="*60)
-            print("Connected to game server!")
-            print("="*60)
-            
-            # Start thread to receive messages from server
-            receive_thread = threading.Thread(target=self.receive_messages)
-            receive_thread.daemon = True
-            receive_thread.start()
-            
-            # Send messages to server
-            self.send_messages()
-            
+            self.open_connection()
         except Exception as e:
             print(f"Failed to connect to server: {e}")
             print(f"Make sure the server is running on {self.host}:{self.port}")
             sys.exit(1)
-    
+
+        self.running = True
+        self.announce_cache()
+
+        print("="*60)
+        print("Connected to game server!")
+        print("="*60)
+
+        # Start thread to run the network loop
+        receive_thread = threading.Thread(target=self.receive_messages)
+        receive_thread.daemon = True
+        receive_thread.start()
+
+        # Send messages to server
+        self.send_messages()
+
+    def open_connection(self):
+        """Open a socket to the server and register it with the selector."""
+        client = socket.create_connection((self.host, self.port), timeout=10)
+        client.setblocking(False)
+        self.client = client
+        # Fresh decoder per connection so a torn sequence never leaks across
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.pending_text = ""
+        self.block = None
+        self.selector.register(client, selectors.EVENT_READ, 'server')
+
+    def close_connection(self):
+        """Unregister and close the current server socket."""
+        if self.client is None:
+            return
+        try:
+            self.selector.unregister(self.client)
+        except (KeyError, ValueError):
+            pass
+        try:
+            self.client.close()
+        except OSError:
+            pass
+        self.client = None
+
     def receive_messages(self):
-        """Receive and display messages from the server."""
+        """Run the network loop, reconnecting whenever the server goes away."""
         while self.running:
+            self.pump()
+            if not self.running:
+                break
+            self.renderer.notice("[DISCONNECTED] Connection to server lost.")
+            if not self.reconnect():
+                break
+
+        self.close_connection()
+
+    def pump(self):
+        """Service socket reads and queued writes until the connection drops."""
+        while self.running and self.client is not None:
+            with self.out_lock:
+                want_write = bool(self.outgoing)
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if want_write else 0)
+            self.selector.modify(self.client, events, 'server')
+
+            for key, mask in self.selector.select(timeout=1.0):
+                if key.data == 'wake':
+                    self.drain_wakeups()
+                    continue
+                try:
+                    if mask & selectors.EVENT_READ and not self.read_server():
+                        self.close_connection()
+                        return
+                    if mask & selectors.EVENT_WRITE:
+                        self.flush_outgoing()
+                except OSError:
+                    self.close_connection()
+                    return
+
+    def drain_wakeups(self):
+        try:
+            while self.wake_recv.recv(1024):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def read_server(self):
+        """Read everything currently available; False once the server closes."""
+        chunks = []
+        while True:
             try:
-                print(">>> ", end='', flush=True)
-                message = self.client.recv(4096).decode('utf-8')
-                if message:
-                    print(message, end='', flush=True)
-                else:
-                    print("\n[DISCONNECTED] Connection to server lost.")
-                    self.running = False
-                    break
-            except Exception as e:
-                if self.running:
-                    print(f"\n[ERROR] Connection error: {e}")
-                    self.running = False
+                data = self.client.recv(65536)
+            except (BlockingIOError, InterruptedError):
                 break
-        
-        self.client.close()
-        sys.exit(0)
-    
+            if not data:
+                self.render_text(self.decoder.decode(b"".join(chunks), final=True))
+                return False
+            chunks.append(data)
+
+        if chunks:
+            self.render_text(self.decoder.decode(b"".join(chunks)))
+        return True
+
+    def render_text(self, text):
+        """Split decoded text into whole lines and hand them to the renderer."""
+        if self.prompt_answered:
+            # The user already answered the partial line shown as the prompt
+            self.pending_text = ""
+            self.prompt_answered = False
+        text = self.pending_text + text
+        lines = text.split("\n")
+        self.pending_text = lines.pop()
+        shown = []
+        for line in lines:
+            if line.startswith(USERNAME_PROMPT + SESSION_PREFIX):
+                # The prompt was answered by our own '@resume'; the server's
+                # reply to it is glued on
+                line = line[len(USERNAME_PROMPT):]
+            if self.block is not None:
+                self.receive_block_line(line, shown)
+            elif line.startswith(BLOCK_PREFIX):
+                fields = line.split()
+                if len(fields) == 4 and fields[3].isdigit() and int(fields[3]) > 0:
+                    self.block = [fields[1], fields[2], int(fields[3]), []]
+            elif line.startswith(CACHED_PREFIX) and self.cache is not None:
+                fields = line.split()
+                text = self.cache.lookup(fields[1], fields[2]) if len(fields) == 3 else None
+                if text is None:
+                    # Lost our copy; have the server send it in full next time
+                    shown.append("[CACHE] That text is no longer cached here. Please try again.")
+                    if len(fields) > 1:
+                        self.queue_message(f"@cache -{fields[1]}", remember=False)
+                else:
+                    shown.extend(text.split("\n")[:-1])
+            elif line.startswith(RESUME_TOKEN_PREFIX):
+                # Keep the token for reconnects; no need to show it
+                self.resume_token = line[len(RESUME_TOKEN_PREFIX):].strip()
+            elif line.startswith(RESUME_REJECTED):
+                # Server forgot us (e.g. it restarted): log in by name instead
+                self.resume_token = None
+                if self.login_line is not None:
+                    self.queue_message(self.login_line, remember=False)
+                    self.prompt_answered = bool(self.pending_text)
+            else:
+                shown.append(line)
+        self.renderer.render(shown, self.pending_text)
+
+    def receive_block_line(self, line, shown):
+        """Collect one line of a framed static block; store it once complete."""
+        key, digest, remaining, block_lines = self.block
+        block_lines.append(line)
+        shown.append(line)
+        self.block[2] = remaining - 1
+        if self.block[2] == 0:
+            self.block = None
+            if self.cache is not None:
+                self.cache.store(key, digest, "\n".join(block_lines) + "\n")
+
+    def announce_cache(self):
+        """Tell the server which static blocks we already hold."""
+        if self.cache is not None:
+            self.queue_message(self.cache.announcement(), remember=False)
+
+    def flush_outgoing(self):
+        with self.out_lock:
+            if not self.outgoing:
+                return
+            sent = self.client.send(self.outgoing)
+            del self.outgoing[:sent]
+
+    def queue_message(self, message, remember=True):
+        """Queue a line for the network loop to send."""
+        if remember:
+            if self.login_line is None:
+                self.login_line = message
+            self.prompt_answered = bool(self.pending_text)
+        with self.out_lock:
+            self.outgoing += (message + "\n").encode('utf-8')
+        try:
+            self.wake_send.send(b"\0")
+        except OSError:
+            pass
+
+    def reconnect(self):
+        """Reconnect with exponential backoff, resuming the session if possible."""
+        attempt = 0
+        while self.running:
+            delay = min(self.max_backoff, 0.5 * (2 ** attempt))
+            delay *= random.uniform(0.8, 1.2)  # Spread out a crowd of clients
+            self.renderer.notice(f"[RECONNECT] Retrying in {delay:.1f}s...")
+            time.sleep(delay)
+            try:
+                self.open_connection()
+            except OSError:
+                attempt += 1
+                continue
+
+            with self.out_lock:
+                self.outgoing.clear()
+            self.renderer.notice("[RECONNECT] Reconnected to server.")
+            self.announce_cache()
+            if self.resume_token is not None:
+                self.queue_message(f"@resume {self.resume_token}", remember=False)
+            elif self.login_line is not None:
+                self.queue_message(self.login_line, remember=False)
+            return True
+        return False
+
     def send_messages(self):
         """Send player commands to the server."""
         while self.running:
@@ -69,13 +368,17 @@ class GameClient:
                     print("Disconnecting from server...")
                     self.running = False
                     break
-                
-                self.client.send(message.encode('utf-8'))
+
+                self.queue_message(message)
+            except EOFError:
+                self.running = False
+                break
             except Exception as e:
                 print(f"Error sending message: {e}")
                 break
-        
-        self.client.close()
+
+        self.running = False
+        self.wake_send.send(b"\0")
         sys.exit(0)
 
 
@@ -84,12 +387,12 @@ def main():
     print("="*60)
     print("Terminal Multiplayer RPG - Client")
     print("="*60)
-    
+
     # Get server connection details
     host = input("Enter server IP (press Enter for localhost): ").strip()
     if not host:
         host = 'localhost'
-    
+
     port_input = input("Enter server port (press Enter for 5555): ").strip()
     if not port_input:
         port = 5555
@@ -99,9 +402,9 @@ def main():
         except ValueError:
             print("Invalid port. Using default 5555.")
             port = 5555
-    
+
     print(f"\nConnecting to {host}:{port}...")
-    
+
     # Create and connect client
     client = GameClient(host, port)
     client.connect()
@@ -109,4 +412,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,186 @@
+"""
+Game Log Module
+Asynchronous structured logging for the server. Callers only build a record
+and put it on a bounded queue; a background writer thread formats and writes
+records, so a slow or blocked stdout (or log shipper pipe) never stalls a
+client thread, even one holding the game-state lock. When the queue is full
+records are dropped and counted rather than blocking the caller.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+QUEUE_SIZE = 10000
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 5
+
+_STOP = object()  # Queued by close() to stop the writer
+
+
+class GameLogger:
+    """Queue-backed logger writing text or JSON lines to a stream or file.
+
+    Each record carries a level, a tag (the familiar "[SAVE]", "[SERVER]"
+    prefixes), an event name, a message and optional fields such as
+    username, location and latency_ms. File output is rotated by size into
+    path.1 ... path.<backups>.
+    """
+
+    def __init__(self, path=None, level="info", json_lines=False, max_bytes=MAX_BYTES,
+                 backups=BACKUPS, queue_size=QUEUE_SIZE, stream=None):
+        self.path = path
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.stream = stream
+        self.file = None
+        self.file_size = 0
+        self.set_level(level)
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counter_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+
+        if path is not None:
+            self.open_file()
+        self.writer = threading.Thread(target=self.writer_loop, name="log-writer")
+        self.writer.daemon = True
+        self.writer.start()
+
+    def set_level(self, level):
+        """Change the minimum level; raises ValueError for unknown names."""
+        if level not in LEVELS:
+            raise ValueError(f"unknown log level '{level}' (use {', '.join(LEVELS)})")
+        self.level = level
+        self.threshold = LEVELS[level]
+
+    def is_enabled(self, level):
+        return LEVELS[level] >= self.threshold
+
+    def log(self, level, tag, message, event=None, **fields):
+        """Queue a record; never blocks. Returns False if it was dropped."""
+        if LEVELS[level] < self.threshold:
+            return True
+        record = {"time": time.time(), "level": level, "tag": tag, "event": event, "message": message}
+        for key, value in fields.items():
+            if value is not None:
+                record[key] = value
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.counter_lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def debug(self, tag, message, event=None, **fields):
+        return self.log("debug", tag, message, event, **fields)
+
+    def info(self, tag, message, event=None, **fields):
+        return self.log("info", tag, message, event, **fields)
+
+    def warning(self, tag, message, event=None, **fields):
+        return self.log("warning", tag, message, event, **fields)
+
+    def error(self, tag, message, event=None, **fields):
+        return self.log("error", tag, message, event, **fields)
+
+    # Writer thread --------------------------------------------------------
+
+    def format(self, record):
+        if self.json_lines:
+            return json.dumps(record, default=str) + "\n"
+        timestamp = datetime.fromtimestamp(record['time']).strftime("%Y-%m-%d %H:%M:%S")
+        return f"{timestamp} {record['level'].upper():<7} [{record['tag']}] {record['message']}\n"
+
+    def writer_loop(self):
+        """Drain the queue, writing whatever has piled up in one go."""
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 256:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is _STOP for record in batch)
+            records = [record for record in batch if record is not _STOP]
+            if records:
+                self.write(''.join(self.format(record) for record in records), len(records))
+            if stop:
+                return
+
+    def write(self, text, count):
+        try:
+            if self.file is not None:
+                data = text.encode('utf-8')
+                if self.file_size and self.file_size + len(data) > self.max_bytes:
+                    self.rotate()
+                self.file.write(data)
+                self.file.flush()
+                self.file_size += len(data)
+            else:
+                stream = self.stream or sys.stdout
+                stream.write(text)
+                stream.flush()
+        except (OSError, ValueError):
+            with self.counter_lock:
+                self.dropped += count
+            return
+        with self.counter_lock:
+            self.written += count
+
+    def open_file(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'ab')
+        self.file_size = self.file.tell()
+
+    def rotate(self):
+        """Shift path -> path.1 -> ... -> path.<backups>, then reopen path."""
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.open_file()
+        self.rotations += 1
+
+    # Lifecycle and reporting ------------------------------------------------
+
+    def close(self, timeout=2):
+        """Flush queued records and stop the writer (waits up to timeout)."""
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self.writer.join(timeout)
+        if self.file is not None and not self.writer.is_alive():
+            self.file.close()
+            self.file = None
+
+    def stats(self):
+        with self.counter_lock:
+            return {
+                "level": self.level,
+                "destination": self.path or "stdout",
+                "format": "json" if self.json_lines else "text",
+                "written": self.written,
+                "dropped": self.dropped,
+                "queued": self.queue.qsize(),
+                "rotations": self.rotations,
+            }
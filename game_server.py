@@ -8,36 +8,128 @@ import threading
 import json
 import random
 import copy
+import functools
 import os
+import secrets
 import signal
-import sys
+import time
 from datetime import datetime
-from game_data import LOCATIONS, ENEMIES, WEAPONS, SPELLS, STARTING_STATS
+from world import load_world, WorldError
+from chat import ChatManager, RateLimited, GLOBAL_CHANNEL, WHISPER_CHANNEL, room_channel
+from save_stream import iter_save, find_player, SaveFormatError
+from leaderboard import Leaderboard, BOARDS
+from save_manager import SaveManager
+from profiler import ProfileManager
+from memory import MemoryReporter
+from game_log import GameLogger
+from recorder import SessionRecorder
+from metrics import Metrics
+from spectator import SpectatorHub, WorldSnapshot, SPECTATE_COMMAND
+from status_api import StatusServer
+from location_cache import LocationCache
+from enemies import EnemyTable
+from static_content import StaticContent, CACHE_COMMAND, parse_announcement
+from protocol import PROTO_COMMAND, PROTOCOLS, PROTOCOL_VERSION, encode_event, render_text
+from rate_limit import ConnectionLimiter, DEFAULT_LIMITS, DEFAULT_STRIKES
+from sharded_save import ShardedSaves, read_manifest, remove_shards
+
+
+# Help categories by number, name and alias
+HELP_CATEGORIES = {
+    '1': 'movement', 'movement': 'movement',
+    '2': 'combat', 'combat': 'combat',
+    '3': 'information', 'info': 'information', 'information': 'information',
+    '4': 'shopping', 'shop': 'shopping', 'shopping': 'shopping',
+    '5': 'social', 'social': 'social',
+    '6': 'all', 'all': 'all'
+}
 
 
 class GameServer:
-    def __init__(self, host='0.0.0.0', port=5555, save_file=None):
+    def __init__(self, host='0.0.0.0', port=5555, save_file=None, world_file=None, admins=None, log=None,
+                 clock=time.monotonic, install_signal_handlers=True):
+        self.log = log or GameLogger()
         self.host = host
         self.port = port
         self.server = None
+        self.world_file = world_file  # None = use game_data.py
+        self.world = load_world(world_file)
+        self.recorder = SessionRecorder(clock)
+        # Every time-dependent feature reads this, so replays can drive it;
+        # it stands still for the length of a recorded turn
+        self.clock = self.recorder.clock
+        self.enemies = EnemyTable(self.world, self.clock)
+        self.location_views = LocationCache(self.world, self.enemies.describe)
+        self.static_content = StaticContent(self.render_static_texts(self.world))
+        self.admins = set(admins or [])
         self.players = {}  # {username: player_data}
         self.client_sockets = {}  # {username: socket}
+        self.client_threads = {}  # {username: handler thread}
+        self.sessions = {}  # {resume_token: username}
+        self.session_tokens = {}  # {username: resume_token}
+        self.input_buffers = {}  # {socket: unterminated input text}
+        self.connections = {}  # {socket: address} for every open client connection
+        self.last_activity = {}  # {socket: clock time of the last line received}
+        self.client_caches = {}  # {socket: {block key: hash}} for clients that cache static blocks
+        self.protocols = {}  # {socket: "json" or "binary"} for structured clients (see protocol.py)
+        self.rate_limiters = {}  # {socket: ConnectionLimiter}
+        self.capture = threading.local()  # Output held back during a batch
+        self.rngs = {}  # {username: random.Random seeded per session}
+        self.chat = ChatManager(clock=self.clock)
+        self.leaderboard = Leaderboard()
+        self.profiler = ProfileManager()
+        self.memory = MemoryReporter()
+        self.max_batch_commands = 10
+        self.metrics = Metrics()
+        self.started_at = self.clock()
+        self.spectators = SpectatorHub(self.build_world_snapshot, self.metrics)
+        self.status_port = None  # Local HTTP status API port; None = disabled
+        self.status_api = None
+        
+        # Admission control; 0 disables a limit or timeout
+        self.max_connections = 200
+        self.max_connections_per_ip = 5
+        self.login_timeout = 60  # Seconds to finish logging in
+        self.idle_timeout = 1800  # Seconds without a command before eviction
+        self.reap_interval = 15
+        
+        # Command rate limits per connection (see rate_limit.py); {} disables
+        self.rate_limits = dict(DEFAULT_LIMITS)
+        self.rate_limit_strikes = DEFAULT_STRIKES  # Rejections before disconnecting; 0 = never
         self.lock = threading.Lock()
         self.save_file = save_file
+        self.last_save = None  # (ISO time, path) of the last successful save
         self.running = True
+        self.shutting_down = False
         self.saves_dir = "saves"
+        self.save_shards = 8  # Shard files per save (see sharded_save.py); 0 = one .tms file
+        self.sharded_saves = ShardedSaves()
+        self.load_path = None  # Save file still being streamed in, if any
+        self.load_manifest = None  # Its manifest, if it is a sharded save
+        self.load_offset = 0  # Bytes of it the loader has finished with
+        self.load_complete = threading.Event()
+        self.load_complete.set()
         
         # Create saves directory if it doesn't exist
         if not os.path.exists(self.saves_dir):
             os.makedirs(self.saves_dir)
+        self.save_manager = SaveManager(self.saves_dir)
         
-        # Load game state if save file provided
+        # Load game state if save file provided. Players are streamed in on a
+        # background thread so the server can accept logins straight away.
         if save_file:
-            self.load_game(save_file)
-        
-        # Setup signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self.shutdown_handler)
-        signal.signal(signal.SIGTERM, self.shutdown_handler)
+            self.start_background_load(save_file)
+        
+        # Setup signal handlers for graceful shutdown, world reloads and
+        # toggling the profilers (SIGUSR1: cProfile, SIGUSR2: sampler)
+        if install_signal_handlers:
+            signal.signal(signal.SIGINT, self.shutdown_handler)
+            signal.signal(signal.SIGTERM, self.shutdown_handler)
+            if hasattr(signal, 'SIGHUP'):
+                signal.signal(signal.SIGHUP, self.reload_handler)
+            if hasattr(signal, 'SIGUSR1'):
+                signal.signal(signal.SIGUSR1, self.profile_handler)
+                signal.signal(signal.SIGUSR2, self.profile_handler)
     
     def save_game(self, save_file=None):
         """Save the current game state to a .tms file."""
@@ -51,62 +143,232 @@ class GameServer:
         
         save_path = os.path.join(self.saves_dir, save_file)
         
-        # Prepare game state
+        # Never write a world that is only partly loaded
+        if not self.load_complete.is_set():
+            self.log.info("SAVE", "Waiting for the save file to finish loading...", event="save_wait")
+            self.load_complete.wait()
+        
+        # Prepare game state from a snapshot taken under the lock, so players
+        # joining or changing mid-save cannot tear the written file
+        with self.lock:
+            players = {username: dict(player, spells=list(player['spells']))
+                       for username, player in self.players.items()}
         game_state = {
             "saved_at": datetime.now().isoformat(),
-            "players": self.players,
+            "players": players,
             "server_info": {
                 "host": self.host,
                 "port": self.port
             }
         }
         
+        started = time.perf_counter()
         try:
-            with open(save_path, 'w') as f:
-                json.dump(game_state, f, indent=2)
-            print(f"[SAVE] Game state saved to {save_path}")
-            return save_path
+            if self.save_shards:
+                # Manifest plus shards, serialized in parallel for big worlds
+                manifest = self.sharded_saves.save(save_path, game_state, self.save_shards)
+                detail = f" ({len(manifest['shards'])} shards)"
+            else:
+                # Write to a temporary file first so a crash never leaves a torn save
+                tmp_path = save_path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(game_state, f, indent=2)
+                os.replace(tmp_path, save_path)
+                remove_shards(save_path)  # Left over if this save used to be sharded
+                detail = ""
+            self.last_save = (game_state["saved_at"], save_path)
+            self.log.info("SAVE", f"Game state saved to {save_path}{detail}", event="save",
+                          latency_ms=round((time.perf_counter() - started) * 1000, 1))
         except Exception as e:
-            print(f"[ERROR] Failed to save game: {e}")
+            self.log.error("ERROR", f"Failed to save game: {e}", event="save_failed")
             return None
+        
+        # Keep a compressed history snapshot alongside the live save. It is
+        # written on the history thread, so saving does not wait for it
+        world_name = os.path.splitext(save_file)[0]
+        
+        def recorded(snapshot_id, error):
+            if error is None:
+                self.log.info("SAVE", f"History snapshot {world_name}@{snapshot_id} recorded", event="save_history")
+            else:
+                self.log.error("ERROR", f"Failed to record save history: {error}", event="save_history_failed")
+        
+        self.save_manager.record_later(world_name, game_state, recorded)
+        return save_path
     
     def load_game(self, save_file):
-        """Load game state from a .tms file."""
+        """Load game state from a .tms file, one player (or shard) at a time."""
         save_path = os.path.join(self.saves_dir, save_file)
         
         if not os.path.exists(save_path):
-            print(f"[ERROR] Save file not found: {save_path}")
+            self.log.error("ERROR", f"Save file not found: {save_path}", event="load_failed")
             return False
         
         try:
-            with open(save_path, 'r') as f:
-                game_state = json.load(f)
+            manifest = read_manifest(save_path)
+            if manifest is not None:
+                players = self.sharded_saves.load(save_path, manifest)
+                saved_at = manifest.get("saved_at", "unknown")
+            else:
+                players = {}
+                saved_at = "unknown"
+                for kind, key, value in iter_save(save_path):
+                    if kind == "player":
+                        players[key] = value
+                    elif key == "saved_at":
+                        saved_at = value
             
-            self.players = game_state.get("players", {})
-            saved_at = game_state.get("saved_at", "unknown")
+            with self.lock:
+                self.players = players
+                self.location_views.reset(players)
+                fixed = self.reconcile_players(self.world)
+            self.leaderboard.rebuild(players)
             
-            print(f"[LOAD] Game state loaded from {save_path}")
-            print(f"[LOAD] Save date: {saved_at}")
-            print(f"[LOAD] Players loaded: {len(self.players)}")
+            self.log.info("LOAD", f"Game state loaded from {save_path}", event="load")
+            self.log.info("LOAD", f"Save date: {saved_at}", event="load")
+            self.log.info("LOAD", f"Players loaded: {len(self.players)}", event="load")
+            if fixed:
+                self.log.warning("LOAD", f"Players moved off missing world content: {fixed}", event="load")
             
             return True
         except Exception as e:
-            print(f"[ERROR] Failed to load game: {e}")
+            self.log.error("ERROR", f"Failed to load game: {e}", event="load_failed")
             return False
     
+    def start_background_load(self, save_file):
+        """Stream players in from a .tms file (or its shards) on a background thread.
+        
+        Until loading finishes, a player who logs in is looked up in the
+        file on demand (see ensure_player_loaded), and saves wait for the
+        load so nobody who has not been read yet is dropped.
+        """
+        save_path = os.path.join(self.saves_dir, save_file)
+        if not os.path.exists(save_path):
+            self.log.error("ERROR", f"Save file not found: {save_path}", event="load_failed")
+            return False
+        try:
+            self.load_manifest = read_manifest(save_path)
+        except (OSError, ValueError, SaveFormatError) as e:
+            self.log.error("ERROR", f"Failed to load game: {e}", event="load_failed")
+            return False
+        
+        self.load_path = save_path
+        self.load_offset = 0
+        self.load_complete.clear()
+        loader = threading.Thread(target=self.background_load_loop, args=(save_path,))
+        loader.daemon = True
+        loader.start()
+        return True
+    
+    def background_load_loop(self, save_path):
+        """Read players from save_path into self.players, reporting progress."""
+        loaded = 0
+        saved_at = "unknown"
+        last_report = time.monotonic()
+        self.log.info("LOAD", f"Streaming game state from {save_path}", event="load_start")
+        
+        def passed(offset):
+            # Every player before offset is in self.players by now
+            self.load_offset = offset
+        
+        try:
+            manifest = self.load_manifest
+            if manifest is None:
+                items = iter_save(save_path, progress=True, boundary=passed)
+            else:
+                saved_at = manifest.get("saved_at", saved_at)
+                items = self.iter_sharded_players(save_path, manifest)
+            for kind, key, value, fraction in items:
+                if kind == "meta":
+                    if key == "saved_at":
+                        saved_at = value
+                    continue
+                
+                self.add_loaded_player(key, value)
+                loaded += 1
+                if time.monotonic() - last_report >= 2:
+                    last_report = time.monotonic()
+                    self.log.info("LOAD", f"{loaded} players loaded ({fraction:.0%})", event="load_progress")
+            
+            self.log.info("LOAD", f"Game state loaded from {save_path}", event="load")
+            self.log.info("LOAD", f"Save date: {saved_at}", event="load")
+            self.log.info("LOAD", f"Players loaded: {loaded}", event="load")
+        except (OSError, ValueError, SaveFormatError) as e:
+            self.log.error("ERROR", f"Failed to load game: {e}", event="load_failed")
+        finally:
+            self.load_path = None
+            self.load_manifest = None
+            self.load_offset = 0
+            self.load_complete.set()
+    
+    def iter_sharded_players(self, save_path, manifest):
+        """Players of a sharded save as iter_save(progress=True) items, shards loaded in parallel."""
+        shards = len(manifest["shards"])
+        for done, players in enumerate(self.sharded_saves.iter_shards(save_path, manifest), 1):
+            for username, data in players.items():
+                yield "player", username, data, done / shards
+    
+    def add_loaded_player(self, username, data):
+        """Insert a player read from a save unless they are already present.
+        
+        A player fetched on demand (and maybe already playing) wins over the
+        copy the background loader reaches later.
+        """
+        with self.lock:
+            if username in self.players:
+                return
+            self.players[username] = data
+            self.location_views.add(username, data['location'])
+            self.reconcile_player(self.world, username, data)
+        self.leaderboard.update(username, data)
+    
+    def ensure_player_loaded(self, username):
+        """Fetch a player from the save being streamed in, if not read yet.
+        
+        Only the part of the file the loader has not reached is searched.
+        """
+        # Read the offset before checking self.players: anyone the loader
+        # passes after this point is then either found there or searched for
+        save_path, manifest, start = self.load_path, self.load_manifest, self.load_offset
+        if save_path is None or self.load_complete.is_set():
+            return
+        with self.lock:
+            if username in self.players:
+                return
+        try:
+            if manifest is not None:
+                data = self.sharded_saves.find_player(save_path, manifest, username)
+            else:
+                data = find_player(save_path, username, start)
+        except (OSError, SaveFormatError) as e:
+            self.log.error("ERROR", f"Failed to fetch {username} from save: {e}", event="load_failed",
+                           username=username)
+            return
+        if data is not None:
+            self.add_loaded_player(username, data)
+    
     def shutdown_handler(self, signum, frame):
-        """Handle graceful shutdown."""
-        print("\n[SERVER] Shutting down gracefully...")
+        """Handle graceful shutdown on SIGINT/SIGTERM."""
+        # Like reload_handler: the main thread may hold self.lock in admit(),
+        # so the shutdown (which takes it) runs on a thread of its own
+        if self.shutting_down:
+            return
+        self.shutting_down = True
+        threading.Thread(target=self.shutdown, name="shutdown").start()
+    
+    def shutdown(self):
+        """Save, disconnect everyone and stop accepting connections."""
+        self.log.info("SERVER", "Shutting down gracefully...", event="shutdown")
         
         # Save game state
         if self.players:
             if self.save_file:
                 self.save_game(self.save_file)
             else:
-                # Auto-generate save file name
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                save_file = f"autosave_{timestamp}.tms"
-                self.save_game(save_file)
+                # One rolling autosave; earlier versions live in its history
+                self.save_game("autosave.tms")
+        self.sharded_saves.close()
+        self.save_manager.wait_idle()
         
         # Notify all connected players
         self.broadcast("[SERVER] Server is shutting down. Your progress has been saved.")
@@ -119,20 +381,167 @@ class GameServer:
                 except:
                     pass
         
-        # Close server socket
+        # Stop the accept loop; start() then returns and the process exits
+        self.running = False
         if self.server:
+            try:
+                self.server.shutdown(socket.SHUT_RDWR)  # Wakes a blocked accept()
+            except OSError:
+                pass
             self.server.close()
         
-        print("[SERVER] Shutdown complete.")
-        sys.exit(0)
+        self.log.info("SERVER", "Shutdown complete.", event="shutdown")
+        self.log.close()
+        
+    def reload_handler(self, signum, frame):
+        """Reload world data on SIGHUP."""
+        # Signal handlers run in the main thread, possibly while it holds
+        # self.lock in admit(); reload on a thread of its own instead
+        threading.Thread(target=self.reload_world, name="world-reload", daemon=True).start()
+    
+    def reload_world(self):
+        """Reload world data and swap it in without dropping connections.
         
+        The new world is fully loaded and validated before anything changes;
+        if validation fails the running world is kept. Returns (ok, message).
+        """
+        try:
+            world = load_world(self.world_file)
+        except WorldError as e:
+            self.log.error("RELOAD", f"World reload rejected: {e}", event="reload_failed")
+            return False, "\n".join(e.errors)
+        
+        with self.lock:
+            fixed = self.reconcile_players(world)
+            self.world = world
+            self.enemies.rebuild(world)
+            self.location_views.set_world(world)
+            self.static_content.set_texts(self.render_static_texts(world))
+        
+        for warning in world.warnings:
+            self.log.warning("RELOAD", f"Warning: {warning}", event="reload")
+        message = f"World reloaded from {world.source} (version {world.digest}), {fixed} player(s) adjusted"
+        self.log.info("RELOAD", message, event="reload")
+        self.broadcast("[SERVER] The world has been updated.")
+        return True, message
+    
+    def reconcile_players(self, world):
+        """Fix players whose location, weapon or spells vanished from world.
+        
+        Caller must hold self.lock. Returns the number of players changed.
+        """
+        fixed = 0
+        for username, player in self.players.items():
+            fixed += self.reconcile_player(world, username, player)
+        return fixed
+    
+    def reconcile_player(self, world, username, player):
+        """Fix one player against world. Caller must hold self.lock."""
+        start = world.starting_stats
+        changed = False
+        if player['location'] not in world.locations:
+            self.set_player_location(username, start['location'])
+            changed = True
+        if player['weapon'] not in world.weapons:
+            player['weapon'] = start['weapon']
+            changed = True
+        spells = [spell_id for spell_id in player['spells'] if spell_id in world.spells]
+        if len(spells) != len(player['spells']):
+            player['spells'] = spells
+            changed = True
+        return changed
+    
+    def profile_handler(self, signum, frame):
+        """Toggle cProfile (SIGUSR1) or the stack sampler (SIGUSR2)."""
+        kind = 'cpu' if signum == signal.SIGUSR1 else 'sample'
+        running = self.profiler.cpu_active if kind == 'cpu' else self.profiler.sampler_thread is not None
+        self.log.info("PROFILE", self.toggle_profiler(kind, 'stop' if running else 'start'), event="profile")
+    
+    def toggle_profiler(self, kind, action):
+        """Start or stop one profiler; returns a message describing the result."""
+        if kind == 'cpu':
+            if action == 'start':
+                started = self.profiler.start_cpu()
+                return "cProfile collection started" if started else "cProfile collection is already running"
+            path = self.profiler.stop_cpu()
+            return f"cProfile stats written to {path}" if path else "No cProfile data collected"
+        
+        if action == 'start':
+            started = self.profiler.start_sampler()
+            return "Stack sampler started" if started else "Stack sampler is already running"
+        path = self.profiler.stop_sampler()
+        return f"Collapsed stacks written to {path}" if path else "Stack sampler was not running"
+    
+    def start_recording(self, path):
+        """Start recording sessions and commands to path (see recorder.py).
+        
+        Players already online get a freshly seeded generator so the
+        recording fixes every random roll from here on, and their rate-limit
+        and chat-rate state is recorded so replays throttle them the same way.
+        """
+        # Like saves, a recording must start from a fully loaded world
+        self.load_complete.wait()
+        
+        def snapshot():
+            with self.lock:
+                players = {username: dict(player, spells=list(player['spells']))
+                           for username, player in self.players.items()}
+                sessions = []
+                for username in self.client_sockets:
+                    seed = secrets.randbits(64)
+                    self.rngs[username] = random.Random(seed)
+                    channels = [name for name, _ in self.chat.named_channels(username)]
+                    client_socket = self.client_sockets[username]
+                    limiter = self.rate_limiters.get(client_socket)
+                    sessions.append(dict(self.connection_state(client_socket),
+                                         user=username, seed=seed, channels=channels,
+                                         limiter=None if limiter is None else limiter.export(),
+                                         chat_rates=self.chat.export_rates(username)))
+                presence = self.location_views.export()
+            header = {"world": self.world.digest, "players": players, "enemies": self.enemies.export(),
+                      "presence": presence}
+            return header, sessions
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        started = self.recorder.start(path, snapshot)
+        if started:
+            self.log.info("RECORD", f"Recording commands to {path}", event="record_start")
+        return started
+    
+    def connection_state(self, client_socket):
+        """A connection's protocol and cached static blocks, as recorded.
+        
+        Caller must hold self.lock.
+        """
+        cache = self.client_caches.get(client_socket)
+        return {"protocol": self.protocols.get(client_socket),
+                "cache": None if cache is None else dict(cache)}
+    
+    def stop_recording(self):
+        """Stop recording; returns (path, records, digest) or None."""
+        def snapshot():
+            with self.lock:
+                return copy.deepcopy(self.players)
+        
+        result = self.recorder.stop(snapshot)
+        if result:
+            path, records, digest = result
+            self.log.info("RECORD", f"Recording saved to {path} ({records} records, state {digest})",
+                          event="record_stop")
+        return result
+    
+    def is_admin(self, username):
+        """Check whether a player may use admin commands."""
+        return username in self.admins
+    
     def auto_save_loop(self):
         """Periodically save game state."""
-        import time
         while self.running:
             time.sleep(300)  # Auto-save every 5 minutes
             if self.players and self.save_file:
-                print("[AUTO-SAVE] Saving game state...")
+                self.log.info("AUTO-SAVE", "Saving game state...", event="autosave")
                 self.save_game()
     
     def start(self):
@@ -140,127 +549,683 @@ class GameServer:
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server.bind((self.host, self.port))
-        self.server.listen(5)
-        print(f"[SERVER] Game server started on {self.host}:{self.port}")
-        print(f"[SERVER] Waiting for players to connect...")
+        self.server.listen(128)  # Room for bursts of players and spectators connecting at once
+        self.log.info("SERVER", f"Game server started on {self.host}:{self.port}", event="start")
+        self.log.info("SERVER", f"World loaded from {self.world.source} (version {self.world.digest})", event="start")
+        for warning in self.world.warnings:
+            self.log.warning("SERVER", f"World warning: {warning}", event="start")
+        self.log.info("SERVER", "Waiting for players to connect...", event="start")
         
         # Start auto-save thread
         if self.save_file:
             auto_save_thread = threading.Thread(target=self.auto_save_loop)
             auto_save_thread.daemon = True
             auto_save_thread.start()
-            print(f"[SERVER] Auto-save enabled (every 5 minutes)")
+            self.log.info("SERVER", "Auto-save enabled (every 5 minutes)", event="start")
+        
+        # Start the reaper that closes idle and half-open connections
+        reaper_thread = threading.Thread(target=self.reap_loop)
+        reaper_thread.daemon = True
+        reaper_thread.start()
+        
+        if self.status_port:
+            try:
+                self.status_api = StatusServer(self.status_summary, self.metrics, port=self.status_port).start()
+                host, port = self.status_api.address
+                self.log.info("SERVER", f"Status API on http://{host}:{port}/status", event="start")
+            except OSError as e:
+                self.log.error("ERROR", f"Status API disabled, could not listen on port {self.status_port}: {e}",
+                               event="status_api_failed")
         
         while True:
             try:
                 client_socket, address = self.server.accept()
-                print(f"[SERVER] New connection from {address}")
+                rejection = self.admit(client_socket, address)
+                if rejection:
+                    self.reject(client_socket, address, rejection)
+                    continue
+                self.log.info("SERVER", f"New connection from {address}", event="connect", address=address[0])
                 thread = threading.Thread(target=self.handle_client, args=(client_socket, address))
                 thread.daemon = True
                 thread.start()
             except Exception as e:
-                print(f"[SERVER ERROR] {e}")
+                if not self.running:
+                    break  # Shut down
+                self.log.error("SERVER ERROR", str(e), event="accept_failed")
                 break
     
+    def admit(self, client_socket, address):
+        """Register a new connection, or return why it must be turned away."""
+        with self.lock:
+            if self.max_connections and len(self.connections) >= self.max_connections:
+                self.metrics.increment("rejected_full")
+                return "The server is full. Please try again later."
+            if self.max_connections_per_ip:
+                same_ip = sum(1 for other in self.connections.values() if other[0] == address[0])
+                if same_ip >= self.max_connections_per_ip:
+                    self.metrics.increment("rejected_per_ip")
+                    return "Too many connections from your address. Please close one and try again."
+            self.connections[client_socket] = address
+            self.last_activity[client_socket] = self.clock()
+        self.metrics.increment("admitted")
+        return None
+    
+    def reject(self, client_socket, address, reason):
+        """Tell a refused client why, without ever blocking the accept loop."""
+        self.log.warning("SERVER", f"Refused connection from {address}: {reason}", event="reject",
+                         address=address[0])
+        try:
+            client_socket.settimeout(1)
+            client_socket.sendall(f"[SERVER] {reason}\n".encode('utf-8'))
+        except OSError:
+            pass
+        client_socket.close()
+    
+    def reap_loop(self):
+        """Periodically evict connections that timed out."""
+        while self.running:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap_idle_connections()
+            except Exception as e:
+                self.log.error("ERROR", f"Reaper failed: {e}", event="reap_failed")
+    
+    def reap_idle_connections(self):
+        """Close connections stuck at login or idle for too long.
+        
+        Idle players' progress is saved before they are disconnected.
+        Returns the number of connections evicted.
+        """
+        now = self.clock()
+        with self.lock:
+            owners = {client_socket: username for username, client_socket in self.client_sockets.items()}
+            stale = []
+            for client_socket, address in self.connections.items():
+                username = owners.get(client_socket)
+                limit = self.idle_timeout if username else self.login_timeout
+                idle = now - self.last_activity.get(client_socket, now)
+                if limit and idle > limit:
+                    stale.append((client_socket, address, username, idle))
+        if not stale:
+            return 0
+        
+        if any(username for _, _, username, _ in stale) and self.players:
+            self.save_game(self.save_file or "autosave.tms")
+        
+        for client_socket, address, username, idle in stale:
+            if username:
+                self.metrics.increment("evicted_idle")
+                notice = f"[SERVER] Disconnected after {idle / 60:.0f} minutes of inactivity. Your progress has been saved.\n"
+            else:
+                self.metrics.increment("evicted_login")
+                notice = "[SERVER] Login timed out. Disconnecting.\n"
+            self.log.info("SERVER", f"Evicting {username or 'unauthenticated connection'} from {address} "
+                                    f"after {idle:.0f}s idle", event="evict", username=username, address=address[0])
+            try:
+                client_socket.settimeout(1)
+                client_socket.sendall(notice.encode('utf-8'))
+            except OSError:
+                pass
+            try:
+                # Unblocks the handler's recv (or a stuck send) so its thread cleans up
+                client_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        return len(stale)
+    
     def handle_client(self, client_socket, address):
         """Handle individual client connection."""
         username = None
+        spectating = False
         try:
-            # Request username
+            # Request username (or a resume token from a reconnecting client)
             self.send_message(client_socket, "Welcome to the Realm of Adventures!\nEnter your username: ")
-            username = self.receive_message(client_socket).strip()
+            username, resumed = self.login(client_socket)
+            
+            if username == SPECTATE_COMMAND:
+                username = None
+                spectating = self.start_spectating(client_socket)
+                if not spectating:
+                    self.send_message(client_socket, "[SPECTATE] Too many spectators right now. Please try again later.\n")
+                return
             
             if not username:
                 self.send_message(client_socket, "Invalid username. Disconnecting.\n")
-                client_socket.close()
                 return
             
+            self.start_session(username, client_socket, address, resumed)
+            self.last_activity[client_socket] = self.clock()
+            
+            # Main game loop for this client
+            while True:
+                command = self.receive_message(client_socket)
+                if command is None:
+                    break
+                
+                self.last_activity[client_socket] = self.clock()
+                if command.startswith(CACHE_COMMAND):
+                    self.update_cache(username, client_socket, command)
+                else:
+                    self.run_command(username, command)
+                
+                limiter = self.rate_limiters.get(client_socket)
+                if limiter is not None and limiter.exceeded:
+                    self.metrics.increment("rate_limit_disconnects")
+                    self.log.warning("RATE", f"Disconnecting {username} ({address}) for flooding commands",
+                                     event="rate_limit_disconnect", username=username)
+                    break
+                
+        except Exception as e:
+            self.log.error("ERROR", f"Client {address}: {e}", event="client_error", username=username)
+        finally:
+            if not spectating:
+                self.end_session(username, client_socket, address)
+    
+    def start_spectating(self, client_socket):
+        """Hand a connection over to the spectator hub; False if it is full."""
+        with self.lock:
+            address = self.connections.get(client_socket)
+        if not self.spectators.add(client_socket, address):
+            return False
+        # From here on the hub owns the socket; it no longer counts as a
+        # player connection for admission limits or the login reaper
+        with self.lock:
+            self.connections.pop(client_socket, None)
+            self.last_activity.pop(client_socket, None)
+            self.input_buffers.pop(client_socket, None)
+            self.client_caches.pop(client_socket, None)
+            self.protocols.pop(client_socket, None)
+        self.log.info("SPECTATE", f"Spectator connected from {address}", event="spectate")
+        return True
+    
+    def status_summary(self):
+        """Everything the status API reports, as one JSON-ready dict."""
+        world = self.world
+        with self.lock:
+            online = sorted((username, self.players[username]['level'], self.players[username]['location'])
+                            for username in self.client_sockets)
+            connections = len(self.connections)
+            total_players = len(self.players)
+        rooms = {}
+        for username, _, location in online:
+            rooms.setdefault(location, []).append(username)
+        
+        last_save = None
+        if self.last_save:
+            last_save = {"time": self.last_save[0], "path": self.last_save[1]}
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "uptime_seconds": round(self.clock() - self.started_at, 1),
+            "players_online": len(online),
+            "players": [{"username": username, "level": level, "location": location}
+                        for username, level, location in online],
+            "rooms": {location: {"name": world.locations[location]['name'] if location in world.locations else location,
+                                 "players": usernames}
+                      for location, usernames in rooms.items()},
+            "connections": connections,
+            "spectators": len(self.spectators),
+            "total_players": total_players,
+            "last_save": last_save,
+            "world": {"source": world.source, "version": world.digest},
+            "metrics": self.metrics.snapshot(),
+        }
+    
+    def build_world_snapshot(self):
+        """An immutable picture of who is where, for spectators."""
+        world = self.world
+        with self.lock:
+            online = sorted((self.players[username]['location'], username) for username in self.client_sockets)
+        rooms = {}
+        for location, username in online:
+            rooms.setdefault(location, []).append(username)
+        return WorldSnapshot(
+            taken_at=time.time(),
+            players_online=len(online),
+            rooms=tuple((location, world.locations[location]['name'] if location in world.locations else location,
+                         tuple(usernames))
+                        for location, usernames in rooms.items()),
+        )
+    
+    def start_session(self, username, client_socket, address, resumed, seed=None):
+        """Attach a logged-in player to client_socket and greet them.
+        
+        seed fixes the session's random number generator (replays pass the
+        recorded one); by default a fresh random seed is drawn.
+        """
+        # The player may not have been streamed in from the save yet
+        self.ensure_player_loaded(username)
+        if seed is None:
+            seed = secrets.randbits(64)
+        
+        with self.recorder.turn() as recording:
             with self.lock:
                 # Create new player or load existing
                 if username not in self.players:
-                    self.players[username] = copy.deepcopy(STARTING_STATS)
-                    self.client_sockets[username] = client_socket
+                    self.players[username] = self.world.new_player()
+                    self.location_views.add(username, self.players[username]['location'])
+                    self.leaderboard.update(username, self.players[username])
                     welcome_msg = f"\n[NEW PLAYER] Welcome, {username}! Your adventure begins...\n"
+                elif resumed:
+                    welcome_msg = f"\n[SESSION] Session resumed. Welcome back, {username}!\n"
                 else:
-                    self.client_sockets[username] = client_socket
                     welcome_msg = f"\n[RETURNING PLAYER] Welcome back, {username}!\n"
+                stale_socket, stale_thread = self.claim_session(username, client_socket)
+                token = self.issue_resume_token(username)
+                self.rngs[username] = random.Random(seed)
+                location = self.players[username]['location']
+                connection = self.connection_state(client_socket) if recording else None
+            
+            self.chat.connect(username, location)
+            if recording:
+                self.recorder.login(username, seed, resumed, connection)
+            self.log.info("SESSION", f"{username} logged in from {address}", event="login",
+                          username=username, location=location, resumed=resumed)
             
             # Send messages outside the lock to avoid deadlock
             self.send_message(client_socket, welcome_msg)
-            self.broadcast(f"[SERVER] {username} has joined the realm!", exclude=username)
+            self.send_message(client_socket, f"[SESSION] Resume token: {token}\n")
+            if stale_socket is None:
+                self.broadcast(f"[SERVER] {username} has joined the realm!", exclude=username)
             
-            # Send initial status
-            self.show_status(username)
-            self.show_location(username)
-            self.send_message(client_socket, "\n[TIP] Type 'help' to see the help menu with command categories.\n\n")
-            
-            # Main game loop for this client
-            while True:
-                command = self.receive_message(client_socket)
-                if not command:
-                    break
-                
+            if not resumed:
+                # Send initial status
+                self.show_status(username)
+                self.show_location(username)
+                self.send_message(client_socket, "\n[TIP] Type 'help' to see the help menu with command categories.\n\n")
+        
+        # Outside the turn: the stale handler records nothing, but must not
+        # wait on us while we wait for it to exit
+        self.close_stale_session(username, stale_socket, stale_thread)
+    
+    def run_command(self, username, command):
+        """Run one line of input from a logged-in player."""
+        started = time.perf_counter()
+        with self.recorder.turn() as recording:
+            if recording:
+                self.recorder.command(username, command.strip())
+            with self.profiler.command_scope():
                 self.process_command(username, command.strip().lower())
-                
-        except Exception as e:
-            print(f"[ERROR] Client {address}: {e}")
-        finally:
+        if self.log.is_enabled("debug"):
+            self.log.debug("COMMAND", f"{username}: {command.strip()}", event="command",
+                           username=username, location=self.players[username]['location'],
+                           latency_ms=round((time.perf_counter() - started) * 1000, 3))
+    
+    def end_session(self, username, client_socket, address):
+        """Detach a closing connection and free everything it held."""
+        if username:
+            with self.recorder.turn() as recording:
+                if self.release_session(username, client_socket):
+                    if recording:
+                        self.recorder.logout(username)
+                    self.chat.disconnect(username)
+                    self.broadcast(f"[SERVER] {username} has left the realm.")
+        with self.lock:
+            self.input_buffers.pop(client_socket, None)
+            self.connections.pop(client_socket, None)
+            self.last_activity.pop(client_socket, None)
+            self.client_caches.pop(client_socket, None)
+            self.protocols.pop(client_socket, None)
+            self.rate_limiters.pop(client_socket, None)
+        client_socket.close()
+        self.log.info("SERVER", f"Connection closed: {address}", event="disconnect", username=username)
+    
+    def login(self, client_socket):
+        """Read a username or '@resume <token>' line; returns (username, resumed).
+        
+        '@cache' (see static_content.py) and '@proto' (see protocol.py)
+        lines may come first.
+        """
+        while True:
+            line = self.receive_message(client_socket)
+            if line is None:
+                return None, False
+            line = line.strip()
+            
+            if line.startswith(CACHE_COMMAND):
+                self.announce_cache(client_socket, line)
+                continue
+            if line.startswith(PROTO_COMMAND):
+                self.choose_protocol(client_socket, line)
+                continue
+            if not line.startswith("@resume "):
+                return line, False
+            
+            token = line[len("@resume "):].strip()
+            with self.lock:
+                username = self.sessions.get(token)
             if username:
-                with self.lock:
-                    if username in self.client_sockets:
-                        del self.client_sockets[username]
-                self.broadcast(f"[SERVER] {username} has left the realm.")
-            client_socket.close()
-            print(f"[SERVER] Connection closed: {address}")
+                return username, True
+            self.send_message(client_socket, "[SESSION] Unknown or expired resume token.\nEnter your username: ")
+    
+    def choose_protocol(self, client_socket, line):
+        """Switch a connection to the protocol named by an '@proto' line."""
+        protocol = line[len(PROTO_COMMAND):].strip().lower()
+        if protocol not in PROTOCOLS:
+            self.send_message(client_socket, f"[PROTO] Unknown protocol '{protocol}'. Choose one of: {', '.join(PROTOCOLS)}\n")
+            return
+        with self.lock:
+            if protocol == "text":
+                self.protocols.pop(client_socket, None)
+            else:
+                self.protocols[client_socket] = protocol
+        if protocol != "text":
+            self.send_bytes(client_socket, encode_event(protocol, "proto", {"protocol": protocol,
+                                                                             "version": PROTOCOL_VERSION}))
+    
+    def announce_cache(self, client_socket, line):
+        """Record the static blocks a caching client says it already holds.
+        
+        '@cache key=hash ...' adds to what the client holds; '@cache -key'
+        tells us it lost its copy, so the next one is sent in full.
+        """
+        forget = [entry[1:] for entry in line[len(CACHE_COMMAND):].split() if entry.startswith("-")]
+        held = parse_announcement(line, self.static_content.blocks)
+        with self.lock:
+            cache = self.client_caches.setdefault(client_socket, {})
+            cache.update(held)
+            for key in forget:
+                cache.pop(key, None)
+    
+    def update_cache(self, username, client_socket, line):
+        """Apply an '@cache' line sent mid-session, recording it like a command."""
+        with self.recorder.turn() as recording:
+            if recording:
+                self.recorder.cache(username, line)
+            # Charged to the info bucket like any command, so it cannot be flooded
+            if self.allow_command(username, CACHE_COMMAND):
+                self.announce_cache(client_socket, line)
+    
+    def issue_resume_token(self, username):
+        """Rotate the player's resume token. Caller must hold self.lock."""
+        old_token = self.session_tokens.get(username)
+        if old_token:
+            self.sessions.pop(old_token, None)
+        token = self.generate_token()
+        self.sessions[token] = username
+        self.session_tokens[username] = token
+        return token
+    
+    def generate_token(self):
+        """A new unguessable resume token."""
+        return secrets.token_urlsafe(16)
+    
+    def claim_session(self, username, client_socket):
+        """Make client_socket the player's live connection. Caller must hold self.lock.
+        
+        Returns the (socket, thread) of any session being taken over.
+        """
+        stale_socket = self.client_sockets.get(username)
+        stale_thread = self.client_threads.get(username)
+        self.client_sockets[username] = client_socket
+        self.client_threads[username] = threading.current_thread()
+        if stale_socket is client_socket:
+            return None, None
+        return stale_socket, stale_thread
+    
+    def close_stale_session(self, username, stale_socket, stale_thread):
+        """Disconnect a connection that another login has taken over."""
+        if stale_socket is None:
+            return
+        try:
+            stale_socket.send(b"[SESSION] You logged in from another connection. Disconnecting.\n")
+        except OSError:
+            pass
+        try:
+            # Unblocks the stale handler's recv so its thread exits promptly
+            stale_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        if stale_thread is not None and stale_thread is not threading.current_thread():
+            stale_thread.join(timeout=2)
+        self.log.info("SESSION", f"{username} took over an existing session", event="takeover", username=username)
+    
+    def release_session(self, username, client_socket):
+        """Forget a closing connection; False if a newer session replaced it."""
+        with self.lock:
+            if self.client_sockets.get(username) is not client_socket:
+                return False
+            del self.client_sockets[username]
+            self.client_threads.pop(username, None)
+            self.rngs.pop(username, None)
+            return True
     
     def send_message(self, client_socket, message):
         """Send message to a client."""
+        protocol = self.protocols.get(client_socket)
+        if protocol is None:
+            data = message.encode('utf-8')
+        else:
+            data = encode_event(protocol, "message", {"text": message})
+        if self.recorder.defer(functools.partial(self.send_held, client_socket, data)):
+            return
         try:
-            client_socket.send(message.encode('utf-8'))
+            client_socket.send(data)
         except Exception as e:
-            print(f"[ERROR] Failed to send message: {e}")
+            self.log.warning("ERROR", f"Failed to send message: {e}", event="send_failed")
             raise
     
     def receive_message(self, client_socket):
-        """Receive message from a client."""
+        """Receive one line from a client; None once the connection closes.
+        
+        Input is split on newlines so several commands that arrive in a
+        single recv are processed one at a time. A chunk with no newline at
+        all is treated as one command, for clients that do not terminate
+        their lines.
+        """
+        with self.lock:
+            buffered = self.input_buffers.pop(client_socket, b"")
+        
+        while b"\n" not in buffered:
+            try:
+                chunk = client_socket.recv(4096)
+            except:
+                return None
+            if not chunk:
+                return None
+            if b"\n" not in chunk and not buffered:
+                return chunk.decode('utf-8', errors='replace')
+            buffered += chunk
+        
+        line, rest = buffered.split(b"\n", 1)
+        if rest:
+            with self.lock:
+                self.input_buffers[client_socket] = rest
+        line = line.decode('utf-8', errors='replace')
+        return line.rstrip("\r")
+    
+    def send_bytes(self, client_socket, data):
+        """Send already-encoded data to a client."""
+        if self.recorder.defer(functools.partial(self.send_held, client_socket, data)):
+            return
         try:
-            return client_socket.recv(4096).decode('utf-8')
-        except:
-            return None
+            client_socket.sendall(data)
+        except Exception as e:
+            self.log.warning("ERROR", f"Failed to send message: {e}", event="send_failed")
+            raise
+    
+    def send_held(self, client_socket, data):
+        """Send output held back during a recorded turn (see recorder.py).
+        
+        A failure is only logged; the connection's handler notices it.
+        """
+        try:
+            client_socket.sendall(data)
+        except OSError as e:
+            self.log.warning("ERROR", f"Failed to send message: {e}", event="send_failed")
+    
+    def protocol(self, username):
+        """The structured protocol of a player's connection, or None for text."""
+        return self.protocols.get(self.client_sockets.get(username))
     
     def send_to_player(self, username, message):
         """Send message to specific player."""
-        if username in self.client_sockets:
+        buffer = self.capture_buffer(username)
+        if buffer is not None:
+            protocol = self.protocol(username)
+            buffer.append(message if protocol is None else encode_event(protocol, "message", {"text": message}))
+        elif username in self.client_sockets:
             self.send_message(self.client_sockets[username], message)
     
+    def send_rendered(self, username, message, payload):
+        """Send a message to a player that is already encoded as payload."""
+        if self.protocol(username) is not None:
+            self.send_to_player(username, message)
+            return
+        buffer = self.capture_buffer(username)
+        if buffer is not None:
+            buffer.append(message)
+        elif username in self.client_sockets:
+            self.send_bytes(self.client_sockets[username], payload)
+    
+    def emit(self, username, event, **fields):
+        """Send one event (see protocol.py) to a player."""
+        self.emit_all(username, [(event, fields)])
+    
+    def emit_all(self, username, events):
+        """Send (event, fields) pairs to a player as a single message.
+        
+        Text clients get the rendered text; structured clients get the
+        encoded events and nothing is formatted for them.
+        """
+        protocol = self.protocol(username)
+        if protocol is None:
+            self.send_to_player(username, ''.join(render_text(event, fields) for event, fields in events))
+            return
+        data = b''.join(encode_event(protocol, event, fields) for event, fields in events)
+        buffer = self.capture_buffer(username)
+        if buffer is not None:
+            buffer.append(data)
+        elif username in self.client_sockets:
+            self.send_bytes(self.client_sockets[username], data)
+    
+    def send_static(self, username, key):
+        """Send a static block, or just a reference to it if the client has it."""
+        block = self.static_content.get(key)
+        with self.lock:
+            cache = self.client_caches.get(self.client_sockets.get(username))
+            if cache is None:
+                held = None
+            else:
+                held = cache.get(key)
+                cache[key] = block.digest
+        if cache is None:
+            self.send_rendered(username, block.text, block.payload)
+        elif held == block.digest:
+            self.metrics.increment("static_blocks_cached")
+            self.metrics.increment("static_bytes_saved", len(block.payload) - len(block.reference_payload))
+            self.send_rendered(username, block.reference, block.reference_payload)
+        else:
+            self.metrics.increment("static_blocks_sent")
+            self.send_rendered(username, block.framed, block.framed_payload)
+    
     def broadcast(self, message, exclude=None):
         """Broadcast message to all connected players."""
         with self.lock:
-            for username, client_socket in self.client_sockets.items():
-                if username != exclude:
-                    self.send_message(client_socket, message + "\n")
+            recipients = [username for username in self.client_sockets if username != exclude]
+        self.deliver(recipients, message + "\n")
+        self.spectators.publish(message + "\n")
     
-    def process_command(self, username, command):
-        """Process player commands."""
-        player = self.players[username]
+    def deliver(self, recipients, message, payload=None):
+        """Send one message to many players, encoding it only once.
+        
+        Sockets are looked up under the lock but written outside it, and a
+        failing recipient is skipped; its own handler notices the dead
+        connection.
+        """
+        if payload is None:
+            payload = message.encode('utf-8')
+        payloads = {None: payload}  # Per protocol, each encoded only once
+        with self.lock:
+            targets = [(username, self.client_sockets.get(username)) for username in recipients]
+        for username, client_socket in targets:
+            protocol = self.protocols.get(client_socket)
+            if protocol not in payloads:
+                payloads[protocol] = encode_event(protocol, "message", {"text": message})
+            buffer = self.capture_buffer(username)
+            if buffer is not None:
+                buffer.append(message if protocol is None else payloads[protocol])
+            elif client_socket is not None:
+                try:
+                    self.send_bytes(client_socket, payloads[protocol])
+                except Exception:
+                    pass
+    
+    def start_capture(self, username):
+        """Hold this thread's output to username until flush_capture."""
+        self.capture.username = username
+        self.capture.buffer = []
+    
+    def capture_buffer(self, username):
+        """Return the capture buffer if this thread is batching for username."""
+        if getattr(self.capture, 'username', None) == username:
+            return self.capture.buffer
+        return None
+    
+    def flush_capture(self, username):
+        """Send everything captured for username as one message."""
+        buffer = self.capture.buffer
+        self.capture.username = None
+        self.capture.buffer = None
+        if buffer and isinstance(buffer[0], bytes):
+            # Structured client: already-encoded events
+            if username in self.client_sockets:
+                self.send_bytes(self.client_sockets[username], b''.join(buffer))
+        elif buffer:
+            self.send_to_player(username, ''.join(buffer))
+    
+    def process_command(self, username, line):
+        """Process a line of input: one command, or several separated by ';'.
+        
+        A batch runs its commands in order and stops at the first one that
+        fails (a blocked exit, a lost fight, ...). Everything the batch
+        sends to this player is coalesced into a single message.
+        """
+        if ';' not in line:
+            self.execute_command(username, line)
+            return
+        
+        commands = [command.strip() for command in line.split(';') if command.strip()]
+        dropped = len(commands) - self.max_batch_commands
+        commands = commands[:self.max_batch_commands]
+        
+        self.start_capture(username)
+        try:
+            for number, command in enumerate(commands, 1):
+                if self.execute_command(username, command) is False:
+                    if number < len(commands):
+                        self.send_to_player(username, f"[BATCH] Stopped at '{command}'; {len(commands) - number} command(s) skipped.\n")
+                    break
+            else:
+                if dropped > 0:
+                    self.send_to_player(username, f"[BATCH] Only {self.max_batch_commands} commands are allowed per line; {dropped} ignored.\n")
+        finally:
+            self.flush_capture(username)
+    
+    def execute_command(self, username, command):
+        """Run a single command. Returns False if the command failed."""
         parts = command.split()
         
         if not parts:
-            return
+            return True
         
         cmd = parts[0]
         
+        if not self.allow_command(username, cmd):
+            return False
+        
         # Movement commands
         if cmd in ['north', 'south', 'east', 'west', 'n', 's', 'e', 'w']:
             direction_map = {'n': 'north', 's': 'south', 'e': 'east', 'w': 'west'}
             direction = direction_map.get(cmd, cmd)
-            self.move_player(username, direction)
+            return self.move_player(username, direction)
+        elif cmd == 'goto':
+            return self.goto(username, parts)
         
         # Combat commands
         elif cmd == 'attack':
-            self.attack(username, parts)
+            return self.attack(username, parts)
         elif cmd == 'cast':
-            self.cast_spell(username, parts)
+            return self.cast_spell(username, parts)
         
         # Information commands
         elif cmd == 'status':
@@ -271,16 +1236,48 @@ class GameServer:
             self.show_inventory(username)
         elif cmd == 'players':
             self.show_players(username)
+        elif cmd == 'top':
+            return self.show_leaderboard(username, parts)
         
         # Shop commands
         elif cmd == 'shop':
             self.show_shop(username)
         elif cmd == 'buy':
-            self.buy_item(username, parts)
+            return self.buy_item(username, parts)
         
         # Communication
         elif cmd == 'say':
-            self.player_say(username, ' '.join(parts[1:]))
+            return self.player_say(username, ' '.join(parts[1:]))
+        elif cmd == 'local':
+            return self.room_say(username, ' '.join(parts[1:]))
+        elif cmd == 'whisper' or cmd == 'tell':
+            return self.whisper(username, parts)
+        elif cmd == 'join':
+            return self.join_channel(username, parts)
+        elif cmd == 'leave':
+            return self.leave_channel(username, parts)
+        elif cmd == 'chat':
+            return self.channel_say(username, parts)
+        elif cmd == 'channels':
+            self.show_channels(username)
+        
+        # Admin
+        elif cmd == 'reload' and self.is_admin(username):
+            ok, message = self.reload_world()
+            tag = "[OK]" if ok else "[ERROR] World reload rejected:"
+            self.send_to_player(username, f"{tag} {message}\n")
+        elif cmd == 'chatstats' and self.is_admin(username):
+            self.show_chat_stats(username)
+        elif cmd == 'profile' and self.is_admin(username):
+            return self.profile_command(username, parts)
+        elif cmd == 'mem' and self.is_admin(username):
+            return self.mem_command(username, parts)
+        elif cmd == 'log' and self.is_admin(username):
+            return self.log_command(username, parts)
+        elif cmd == 'record' and self.is_admin(username):
+            return self.record_command(username, parts)
+        elif cmd == 'stats' and self.is_admin(username):
+            self.show_server_stats(username)
         
         # Help
         elif cmd == 'help':
@@ -293,71 +1290,121 @@ class GameServer:
         
         else:
             self.send_to_player(username, "Unknown command. Type 'help' for available commands.\n")
+            return False
+        
+        return True
+    
+    def allow_command(self, username, cmd):
+        """Charge a command to the player's connection; False if it is throttled."""
+        client_socket = self.client_sockets.get(username)
+        if client_socket is None or not self.rate_limits:
+            return True
+        with self.lock:
+            limiter = self.rate_limiters.get(client_socket)
+            if limiter is None:
+                limiter = ConnectionLimiter(self.rate_limits, self.rate_limit_strikes, self.clock)
+                self.rate_limiters[client_socket] = limiter
+        
+        kind, wait = limiter.check(cmd)
+        if not wait:
+            return True
+        self.metrics.increment("rate_limited")
+        self.metrics.increment(f"rate_limited_{kind}")
+        if limiter.exceeded:
+            self.send_to_player(username, "[RATE] Too many commands. Disconnecting.\n")
+        else:
+            self.send_to_player(username, f"[RATE] Slow down! Too many {kind} commands; try again in {wait:.1f}s.\n")
+        return False
     
     def move_player(self, username, direction):
         """Move player to a new location."""
+        world = self.world
         player = self.players[username]
-        current_loc = LOCATIONS[player['location']]
+        current_loc = world.locations[player['location']]
         
         if direction in current_loc['exits']:
             new_location = current_loc['exits'][direction]
-            player['location'] = new_location
+            self.set_player_location(username, new_location)
             
             self.broadcast(f"[INFO] {username} traveled {direction}.", exclude=username)
             self.send_to_player(username, f"\nYou travel {direction}...\n")
             self.show_location(username)
+            return True
         else:
             self.send_to_player(username, "You can't go that way!\n")
+            return False
     
-    def show_location(self, username):
-        """Show current location details."""
+    def set_player_location(self, username, location):
+        """Move a player and keep location-based indexes up to date."""
+        player = self.players[username]
+        old_location = player['location']
+        player['location'] = location
+        self.chat.move(username, old_location, location)
+        self.location_views.move(username, old_location, location)
+    
+    def goto(self, username, parts):
+        """Travel to a named location along the shortest route in one command."""
+        world = self.world
         player = self.players[username]
-        loc = LOCATIONS[player['location']]
         
-        msg = f"\n{'='*60}\n"
-        msg += f"LOCATION: {loc['name']}\n"
-        msg += f"{'='*60}\n"
-        msg += f"{loc['description']}\n\n"
+        if len(parts) < 2:
+            self.send_to_player(username, "Usage: goto <location>\n")
+            return False
         
-        # Show exits
-        exits = ', '.join(loc['exits'].keys())
-        msg += f"Exits: {exits}\n"
+        target = world.find_location(' '.join(parts[1:]))
+        if target is None:
+            self.send_to_player(username, "There is no such place!\n")
+            return False
         
-        # Show other players here
-        players_here = [p for p, data in self.players.items() 
-                       if data['location'] == player['location'] and p != username]
-        if players_here:
-            msg += f"Players here: {', '.join(players_here)}\n"
+        route = world.route(player['location'], target)
+        if route is None:
+            self.send_to_player(username, "You can't find a way there from here!\n")
+            return False
+        if not route:
+            self.send_to_player(username, "You are already there!\n")
+            return False
         
-        # Show enemies
-        if loc['enemies']:
-            msg += f"[!] Enemies: {', '.join([ENEMIES[e]['name'] for e in loc['enemies']])}\n"
+        # Walk the whole route at once; others see a single summary
+        self.set_player_location(username, target)
+        destination = world.locations[target]['name']
         
-        msg += f"{'='*60}\n"
-        self.send_to_player(username, msg)
+        self.broadcast(f"[INFO] {username} traveled to {destination}.", exclude=username)
+        self.send_to_player(username, f"\nYou travel {', '.join(route)}...\n")
+        self.show_location(username)
+        return True
+    
+    def show_location(self, username):
+        """Show current location details."""
+        # Rendered once and reused until someone enters or leaves the location
+        # or its enemies change
+        self.respawn_enemies()
+        location = self.players[username]['location']
+        if self.protocol(username) is not None:
+            loc = self.world.locations[location]
+            self.emit(username, "location", id=location, name=loc['name'], exits=loc['exits'],
+                      players=self.location_views.occupants(location, username),
+                      enemies=self.enemies.state(location))
+            return
+        msg, payload = self.location_views.render(location, username)
+        self.send_rendered(username, msg, payload)
     
     def show_status(self, username):
         """Show player status."""
+        world = self.world
         player = self.players[username]
-        weapon = WEAPONS[player['weapon']]
+        weapon = world.weapons[player['weapon']]
         
-        msg = f"\n{'='*60}\n"
-        msg += f"CHARACTER: {username} - Level {player['level']} Adventurer\n"
-        msg += f"{'='*60}\n"
-        msg += f"Health: {player['health']}/{player['max_health']}\n"
-        msg += f"Mana: {player['mana']}/{player['max_mana']}\n"
-        msg += f"EXP: {player['exp']}/{player['exp_to_level']}\n"
-        msg += f"Gold: {player['gold']}\n"
-        msg += f"Weapon: {weapon['name']} (Damage: {weapon['damage']})\n"
-        msg += f"Spells: {len(player['spells'])}\n"
-        msg += f"{'='*60}\n"
-        
-        self.send_to_player(username, msg)
+        self.emit(username, "status", user=username, level=player['level'],
+                  hp=player['health'], max_hp=player['max_health'],
+                  mana=player['mana'], max_mana=player['max_mana'],
+                  exp=player['exp'], exp_to_level=player['exp_to_level'], gold=player['gold'],
+                  weapon=weapon['name'], weapon_damage=weapon['damage'], spells=len(player['spells']))
     
     def show_inventory(self, username):
         """Show player inventory."""
+        world = self.world
         player = self.players[username]
-        weapon = WEAPONS[player['weapon']]
+        weapon = world.weapons[player['weapon']]
         
         msg = f"\n{'='*60}\n"
         msg += f"INVENTORY\n"
@@ -367,7 +1414,7 @@ class GameServer:
         if player['spells']:
             msg += "Known Spells:\n"
             for spell_id in player['spells']:
-                spell = SPELLS[spell_id]
+                spell = world.spells[spell_id]
                 msg += f"  - {spell['name']}: {spell['damage']} damage, {spell['mana_cost']} mana\n"
         else:
             msg += "No spells learned yet.\n"
@@ -378,84 +1425,118 @@ class GameServer:
     
     def attack(self, username, parts):
         """Handle combat."""
+        world = self.world
         player = self.players[username]
-        loc = LOCATIONS[player['location']]
+        location = player['location']
+        loc = world.locations[location]
         
         if not loc['enemies']:
             self.send_to_player(username, "There are no enemies here to fight!\n")
-            return
+            return False
         
         if len(parts) < 2:
             self.send_to_player(username, f"Usage: attack <enemy>\nAvailable: {', '.join(loc['enemies'])}\n")
-            return
+            return False
         
         enemy_type = parts[1]
         if enemy_type not in loc['enemies']:
             self.send_to_player(username, "That enemy is not here!\n")
-            return
+            return False
         
-        # Combat!
-        enemy = copy.deepcopy(ENEMIES[enemy_type])
-        weapon = WEAPONS[player['weapon']]
+        enemy = world.enemies[enemy_type]
+        weapon = world.weapons[player['weapon']]
+        rng = self.rngs[username]
+        enemies = self.enemies
+        self.respawn_enemies()
+        
+        # Combat! The enemy is shared with everyone in the room, so the whole
+        # fight runs under the enemy table's lock; events go out afterwards
+        events = []
+        slain = False
+        with enemies.lock:
+            index = enemies.slot(location, enemy_type)
+            if index is None or not enemies.alive(index):
+                index = None
+            else:
+                events.append(("combat_start", {"enemy": enemy['name']}))
+                while player['health'] > 0:
+                    # Player attacks
+                    player_damage = weapon['damage'] + rng.randint(-2, 5)
+                    slain = enemies.damage(index, player_damage)
+                    
+                    events.append(("combat_round", {"dmg": player_damage, "enemy_hp": enemies.health[index]}))
+                    
+                    if slain:
+                        break
+                    
+                    # Enemy attacks
+                    enemy_damage = enemy['damage'] + rng.randint(-2, 3)
+                    player['health'] -= enemy_damage
+                    
+                    events.append(("combat_hit", {"dmg": enemy_damage, "hp": max(0, player['health'])}))
+        
+        if index is None:
+            self.send_to_player(username, f"The {enemy['name']} here has been slain. It will return soon.\n")
+            return False
         
-        self.send_to_player(username, f"\n[COMBAT] Battle started with {enemy['name']}!\n")
+        self.location_views.invalidate(location)
+        self.emit_all(username, events)
         self.broadcast(f"[COMBAT] {username} is fighting a {enemy['name']}!", exclude=username)
         
-        while enemy['health'] > 0 and player['health'] > 0:
-            # Player attacks
-            player_damage = weapon['damage'] + random.randint(-2, 5)
-            enemy['health'] -= player_damage
-            
-            self.send_to_player(username, f"You strike for {player_damage} damage! Enemy health: {max(0, enemy['health'])}\n")
-            
-            if enemy['health'] <= 0:
-                break
-            
-            # Enemy attacks
-            enemy_damage = enemy['damage'] + random.randint(-2, 3)
-            player['health'] -= enemy_damage
-            
-            self.send_to_player(username, f"Enemy hits you for {enemy_damage} damage! Your health: {max(0, player['health'])}\n")
-        
         # Combat resolution
-        if player['health'] > 0:
-            player['exp'] += enemy['exp_reward']
-            player['gold'] += enemy['gold_reward']
-            
-            self.send_to_player(username, f"\n[VICTORY] You gained {enemy['exp_reward']} EXP and {enemy['gold_reward']} gold!\n")
-            self.send_to_player(username, f"\n[INFO] You now have {player['health']} health, {player['mana']} mana, {player['gold']} gold, and {player['exp']} EXP.\n")
-            self.broadcast(f"[COMBAT] {username} defeated a {enemy['name']}!", exclude=username)
-            
-            # Check for level up
-            if player['exp'] >= player['exp_to_level']:
-                self.level_up(username)
+        if slain:
+            self.reward_kill(username, enemy)
+            return True
         else:
             player['health'] = player['max_health'] // 2
-            player['location'] = 'town_square'
+            self.set_player_location(username, world.starting_stats['location'])
             player['gold'] = max(0, player['gold'] - 20)
+            self.leaderboard.update(username, player)
             
-            self.send_to_player(username, "\n[DEFEAT] You were defeated! You wake up in the town square with reduced gold.\n")
+            self.emit(username, "defeat")
             self.broadcast(f"[COMBAT] {username} was defeated by a {enemy['name']}!", exclude=username)
             self.show_location(username)
+            return False
+    
+    def reward_kill(self, username, enemy):
+        """Give a player the rewards for slaying an enemy."""
+        player = self.players[username]
+        player['exp'] += enemy['exp_reward']
+        player['gold'] += enemy['gold_reward']
+        
+        self.emit(username, "victory", enemy=enemy['name'], exp=enemy['exp_reward'], gold=enemy['gold_reward'],
+                  hp=player['health'], mana=player['mana'], total_gold=player['gold'], total_exp=player['exp'])
+        self.broadcast(f"[COMBAT] {username} defeated a {enemy['name']}!", exclude=username)
+        
+        # Check for level up
+        if player['exp'] >= player['exp_to_level']:
+            self.level_up(username)
+        self.leaderboard.update(username, player)
+    
+    def respawn_enemies(self):
+        """Run the enemy respawn scheduler and refresh the locations it changed."""
+        for location in self.enemies.respawn_due():
+            self.location_views.invalidate(location)
     
     def cast_spell(self, username, parts):
         """Cast a spell."""
+        world = self.world
         player = self.players[username]
         
         if len(parts) < 2:
-            self.send_to_player(username, "Usage: cast <spell_name>\n")
-            return
+            self.send_to_player(username, "Usage: cast <spell_name> [enemy]\n")
+            return False
         
         spell_id = parts[1]
         if spell_id not in player['spells']:
             self.send_to_player(username, "You don't know that spell!\n")
-            return
+            return False
         
-        spell = SPELLS[spell_id]
+        spell = world.spells[spell_id]
         
         if player['mana'] < spell['mana_cost']:
             self.send_to_player(username, f"Not enough mana! Need {spell['mana_cost']}, have {player['mana']}\n")
-            return
+            return False
         
         player['mana'] -= spell['mana_cost']
         
@@ -463,21 +1544,41 @@ class GameServer:
         if spell['damage'] < 0:
             heal_amount = abs(spell['damage'])
             player['health'] = min(player['max_health'], player['health'] + heal_amount)
-            self.send_to_player(username, f"[SPELL] You cast {spell['name']} and restore {heal_amount} health!\n")
+            self.emit(username, "spell_heal", spell=spell['name'], amount=heal_amount, hp=player['health'])
+            return True
         else:
-            # Attack spell (similar to attack command but with spell damage)
-            loc = LOCATIONS[player['location']]
-            if not loc['enemies']:
-                self.send_to_player(username, "There are no enemies here!\n")
-                player['mana'] += spell['mana_cost']  # Refund mana
-                return
+            # Attack spell: hits the named enemy, or the first one still standing
+            location = player['location']
+            loc = world.locations[location]
+            target = parts[2] if len(parts) > 2 else None
+            self.respawn_enemies()
+            
+            index = None
+            with self.enemies.lock:
+                if target is None:
+                    index = self.enemies.first_alive(location) if loc['enemies'] else None
+                elif target in loc['enemies']:
+                    index = self.enemies.slot(location, target)
+                    if index is not None and not self.enemies.alive(index):
+                        index = None
+                if index is not None:
+                    enemy = world.enemies[self.enemies.keys[index][1]]
+                    damage = spell['damage'] + self.rngs[username].randint(-3, 3)
+                    slain = self.enemies.damage(index, damage)
+                    remaining = self.enemies.health[index]
             
-            enemy_type = loc['enemies'][0]
-            enemy = copy.deepcopy(ENEMIES[enemy_type])
-            damage = spell['damage'] + random.randint(-3, 3)
+            if index is None:
+                self.send_to_player(username, "There are no enemies here!\n" if target is None
+                                    else "That enemy is not here!\n")
+                player['mana'] += spell['mana_cost']  # Refund mana
+                return False
             
-            self.send_to_player(username, f"[SPELL] You cast {spell['name']} for {damage} damage!\n")
+            self.location_views.invalidate(location)
+            self.emit(username, "spell_hit", spell=spell['name'], enemy=enemy['name'], dmg=damage, enemy_hp=remaining)
             self.broadcast(f"[MAGIC] {username} casts {spell['name']}!", exclude=username)
+            if slain:
+                self.reward_kill(username, enemy)
+            return True
     
     def level_up(self, username):
         """Level up a player."""
@@ -489,123 +1590,399 @@ class GameServer:
         player['health'] = player['max_health']
         player['max_mana'] += 10
         player['mana'] = player['max_mana']
+        self.leaderboard.update(username, player)
         
-        msg = f"\n*** LEVEL UP! You are now level {player['level']}! ***\n"
-        msg += f"Max Health: +20 (now {player['max_health']})\n"
-        msg += f"Max Mana: +10 (now {player['max_mana']})\n"
-        
-        self.send_to_player(username, msg)
+        self.emit(username, "level_up", level=player['level'], max_hp=player['max_health'], max_mana=player['max_mana'])
         self.broadcast(f"[SERVER] {username} reached level {player['level']}!", exclude=username)
     
     def show_shop(self, username):
         """Show the shop."""
+        self.send_static(username, "shop")
+    
+    def shop_text(self, world):
+        """Render the shop listing for a world."""
         msg = f"\n{'='*60}\n"
         msg += "SHOP\n"
         msg += f"{'='*60}\n\n"
         
         msg += "WEAPONS:\n"
-        for weapon_id, weapon in WEAPONS.items():
+        for weapon_id, weapon in world.weapons.items():
             msg += f"  {weapon_id}: {weapon['name']} - {weapon['damage']} damage - {weapon['cost']} gold\n"
         
         msg += "\nSPELLS:\n"
-        for spell_id, spell in SPELLS.items():
+        for spell_id, spell in world.spells.items():
             msg += f"  {spell_id}: {spell['name']} - {spell['damage']} damage - {spell['cost']} gold\n"
         
         msg += f"\n{'='*60}\n"
         msg += "Usage: buy <item_id>\n"
         
-        self.send_to_player(username, msg)
+        return msg
     
     def buy_item(self, username, parts):
         """Buy an item from the shop."""
+        world = self.world
         player = self.players[username]
         
         if len(parts) < 2:
             self.send_to_player(username, "Usage: buy <item_id>\n")
-            return
+            return False
         
         item_id = parts[1]
         
-        if item_id in WEAPONS:
-            weapon = WEAPONS[item_id]
+        if item_id in world.weapons:
+            weapon = world.weapons[item_id]
             if player['gold'] >= weapon['cost']:
                 player['gold'] -= weapon['cost']
                 player['weapon'] = item_id
+                self.leaderboard.update(username, player)
                 self.send_to_player(username, f"[OK] Purchased {weapon['name']}!\n")
+                return True
             else:
                 self.send_to_player(username, f"Not enough gold! Need {weapon['cost']}, have {player['gold']}\n")
         
-        elif item_id in SPELLS:
-            spell = SPELLS[item_id]
+        elif item_id in world.spells:
+            spell = world.spells[item_id]
             if item_id in player['spells']:
                 self.send_to_player(username, "You already know this spell!\n")
             elif player['gold'] >= spell['cost']:
                 player['gold'] -= spell['cost']
                 player['spells'].append(item_id)
+                self.leaderboard.update(username, player)
                 self.send_to_player(username, f"[OK] Learned {spell['name']}!\n")
+                return True
             else:
                 self.send_to_player(username, f"Not enough gold! Need {spell['cost']}, have {player['gold']}\n")
         else:
             self.send_to_player(username, "Item not found!\n")
+        return False
     
     def show_players(self, username):
         """Show all connected players."""
+        world = self.world
         msg = f"\n{'='*60}\n"
         msg += "ONLINE PLAYERS\n"
         msg += f"{'='*60}\n"
         
-        for player_name, player_data in self.players.items():
-            if player_name in self.client_sockets:
-                location = LOCATIONS[player_data['location']]['name']
-                msg += f"  {player_name} - Level {player_data['level']} - {location}\n"
+        # Snapshot under the lock: the background loader may be adding players
+        with self.lock:
+            online = [(player_name, self.players[player_name]['level'], self.players[player_name]['location'])
+                      for player_name in self.client_sockets]
+        for player_name, level, location in online:
+            msg += f"  {player_name} - Level {level} - {world.locations[location]['name']}\n"
+        
+        msg += f"{'='*60}\n"
+        self.send_to_player(username, msg)
+    
+    def show_leaderboard(self, username, parts):
+        """Show the top players by level and/or gold, plus the player's rank."""
+        boards = BOARDS
+        count = 10
+        for arg in parts[1:]:
+            if arg in BOARDS:
+                boards = (arg,)
+            elif arg.isdigit():
+                count = max(1, min(50, int(arg)))
+            else:
+                self.send_to_player(username, "Usage: top [level|gold] [n]\n")
+                return False
         
+        msg = f"\n{'='*60}\n"
+        msg += "LEADERBOARD\n"
+        msg += f"{'='*60}\n"
+        for board in boards:
+            msg += "TOP BY LEVEL:\n" if board == 'level' else "TOP BY GOLD:\n"
+            for rank, name, key in self.leaderboard.top(board, count):
+                if board == 'level':
+                    msg += f"  {rank:>3}. {name} - Level {-key[0]} ({-key[1]} EXP)\n"
+                else:
+                    msg += f"  {rank:>3}. {name} - {-key[0]} gold\n"
+            msg += f"  Your rank: {self.leaderboard.rank(board, username)} of {len(self.leaderboard)}\n\n"
         msg += f"{'='*60}\n"
         self.send_to_player(username, msg)
+        return True
     
     def player_say(self, username, message):
-        """Player chat."""
+        """Player chat to everyone online."""
         if message:
-            self.broadcast(f"[{username}]: {message}", exclude=None)
+            return self.publish_chat(username, GLOBAL_CHANNEL, f"[{username}]: {message}\n")
         else:
             self.send_to_player(username, "Usage: say <message>\n")
+            return False
+    
+    def room_say(self, username, message):
+        """Chat to the players in the same location."""
+        if not message:
+            self.send_to_player(username, "Usage: local <message>\n")
+            return False
+        location = self.players[username]['location']
+        name = self.world.locations[location]['name']
+        return self.publish_chat(username, room_channel(location), f"[{name}] {username}: {message}\n")
+    
+    def whisper(self, username, parts):
+        """Private message to one online player."""
+        if len(parts) < 3:
+            self.send_to_player(username, "Usage: whisper <player> <message>\n")
+            return False
+        
+        # Commands arrive lowercased, so match the target name loosely
+        with self.lock:
+            target = next((name for name in self.client_sockets if name.lower() == parts[1]), None)
+        if target is None:
+            self.send_to_player(username, "That player is not online!\n")
+            return False
+        
+        message = ' '.join(parts[2:])
+        if not self.publish_chat(username, WHISPER_CHANNEL, f"[{username} whispers]: {message}\n", recipients=[target]):
+            return False
+        if target != username:
+            self.send_to_player(username, f"[You whisper to {target}]: {message}\n")
+        return True
+    
+    def join_channel(self, username, parts):
+        """Join a named chat channel."""
+        if len(parts) < 2:
+            self.send_to_player(username, "Usage: join <channel>\n")
+            return False
+        if not self.chat.join(username, parts[1]):
+            self.send_to_player(username, "Channel names must be letters and digits (max 20).\n")
+            return False
+        self.send_to_player(username, f"[CHAT] You joined #{parts[1]}. Talk with: chat {parts[1]} <message>\n")
+        return True
+    
+    def leave_channel(self, username, parts):
+        """Leave a named chat channel."""
+        if len(parts) < 2:
+            self.send_to_player(username, "Usage: leave <channel>\n")
+            return False
+        if not self.chat.leave(username, parts[1]):
+            self.send_to_player(username, "You are not in that channel!\n")
+            return False
+        self.send_to_player(username, f"[CHAT] You left #{parts[1]}.\n")
+        return True
+    
+    def channel_say(self, username, parts):
+        """Chat in a named channel the player has joined."""
+        if len(parts) < 3:
+            self.send_to_player(username, "Usage: chat <channel> <message>\n")
+            return False
+        message = ' '.join(parts[2:])
+        return self.publish_chat(username, parts[1], f"[#{parts[1]}] {username}: {message}\n")
+    
+    def publish_chat(self, username, channel, message, recipients=None):
+        """Send a chat message through a channel. Returns False if refused."""
+        try:
+            recipients, payload = self.chat.publish(channel, username, message, recipients)
+        except KeyError:
+            self.send_to_player(username, "You are not in that channel! Type 'channels' to see yours.\n")
+            return False
+        except RateLimited as e:
+            self.send_to_player(username, f"[CHAT] You are sending messages too fast. Try again in {e.retry_after:.0f}s.\n")
+            return False
+        self.deliver(recipients, message, payload)
+        if channel == GLOBAL_CHANNEL or channel.startswith("room:"):
+            self.spectators.publish(message)
+        return True
+    
+    def show_channels(self, username):
+        """Show the player's chat channels."""
+        msg = f"\n{'='*60}\n"
+        msg += "CHAT CHANNELS\n"
+        msg += f"{'='*60}\n"
+        msg += "  say <message>              - Everyone online\n"
+        msg += "  local <message>            - Players in your location\n"
+        msg += "  whisper <player> <message> - One player\n"
+        for name, count in self.chat.named_channels(username):
+            msg += f"  chat {name} <message> - #{name} ({count} listening)\n"
+        msg += f"{'='*60}\n"
+        self.send_to_player(username, msg)
+    
+    def profile_command(self, username, parts):
+        """profile start|stop [cpu|sample], or profile status (admin)."""
+        action = parts[1] if len(parts) > 1 else 'status'
+        kinds = [parts[2]] if len(parts) > 2 else ['cpu']
+        
+        if action == 'status':
+            self.send_to_player(username, ''.join(f"[PROFILE] {line}\n" for line in self.profiler.status()))
+            return True
+        if action not in ('start', 'stop') or kinds[0] not in ('cpu', 'sample', 'all'):
+            self.send_to_player(username, "Usage: profile start|stop [cpu|sample|all], or profile status\n")
+            return False
+        if kinds[0] == 'all':
+            kinds = ['cpu', 'sample']
+        
+        for kind in kinds:
+            message = self.toggle_profiler(kind, action)
+            self.log.info("PROFILE", f"{message} (by {username})", event="profile", username=username)
+            self.send_to_player(username, f"[PROFILE] {message}\n")
+        return True
+    
+    def mem_command(self, username, parts):
+        """mem, mem trace start|stop, mem snapshot [label] or mem diff (admin)."""
+        action = parts[1] if len(parts) > 1 else 'report'
+        
+        if action == 'report':
+            lines = self.memory.report(self)
+        elif action == 'trace' and len(parts) > 2 and parts[2] in ('start', 'stop'):
+            if parts[2] == 'start':
+                started = self.memory.start_tracing()
+                lines = ["tracemalloc started." if started else "tracemalloc is already running."]
+            else:
+                stopped = self.memory.stop_tracing()
+                lines = ["tracemalloc stopped." if stopped else "tracemalloc is not running."]
+        elif action == 'snapshot':
+            label = ' '.join(parts[2:]) or datetime.now().strftime("%H:%M:%S")
+            if self.memory.take_snapshot(label) is None:
+                lines = ["tracemalloc is not running (use 'mem trace start')."]
+            else:
+                lines = [f"Snapshot '{label}' taken. Largest allocation sites:"] + self.memory.top_allocations()
+        elif action == 'diff':
+            lines = self.memory.diff()
+        else:
+            self.send_to_player(username, "Usage: mem, mem trace start|stop, mem snapshot [label], mem diff\n")
+            return False
+        
+        msg = f"\n{'='*60}\n"
+        msg += "MEMORY\n"
+        msg += f"{'='*60}\n"
+        msg += ''.join(f"{line}\n" for line in lines)
+        msg += f"{'='*60}\n"
+        self.send_to_player(username, msg)
+        return True
+    
+    def log_command(self, username, parts):
+        """log, or log level debug|info|warning|error (admin)."""
+        if len(parts) == 3 and parts[1] == 'level':
+            try:
+                self.log.set_level(parts[2])
+            except ValueError as e:
+                self.send_to_player(username, f"{e}\n")
+                return False
+            self.log.info("LOG", f"Log level set to {parts[2]} (by {username})", event="log_level", username=username)
+            self.send_to_player(username, f"[LOG] Log level set to {parts[2]}.\n")
+            return True
+        if len(parts) != 1:
+            self.send_to_player(username, "Usage: log, or log level debug|info|warning|error\n")
+            return False
+        
+        stats = self.log.stats()
+        msg = f"\n{'='*60}\n"
+        msg += "LOGGING\n"
+        msg += f"{'='*60}\n"
+        msg += f"  Level:       {stats['level']}\n"
+        msg += f"  Destination: {stats['destination']} ({stats['format']})\n"
+        msg += f"  Written:     {stats['written']}\n"
+        msg += f"  Dropped:     {stats['dropped']}\n"
+        msg += f"  Queued:      {stats['queued']}\n"
+        msg += f"  Rotations:   {stats['rotations']}\n"
+        msg += f"{'='*60}\n"
+        self.send_to_player(username, msg)
+        return True
+    
+    def record_command(self, username, parts):
+        """record start [name], record stop or record status (admin)."""
+        action = parts[1] if len(parts) > 1 else 'status'
+        
+        if action == 'start' and len(parts) <= 3:
+            name = parts[2] if len(parts) == 3 else datetime.now().strftime("session_%Y%m%d_%H%M%S")
+            path = os.path.join("recordings", f"{name}.jsonl")
+            if not self.start_recording(path):
+                self.send_to_player(username, f"[RECORD] Already recording to {self.recorder.path}.\n")
+                return False
+            self.send_to_player(username, f"[RECORD] Recording to {path}.\n")
+        elif action == 'stop' and len(parts) == 2:
+            result = self.stop_recording()
+            if result is None:
+                self.send_to_player(username, "[RECORD] Not recording.\n")
+                return False
+            path, records, digest = result
+            self.send_to_player(username, f"[RECORD] Saved {records} records to {path} (state {digest}).\n")
+        elif action == 'status' and len(parts) == 2:
+            if self.recorder.active:
+                self.send_to_player(username, f"[RECORD] Recording to {self.recorder.path}, "
+                                              f"{self.recorder.records} records so far.\n")
+            else:
+                self.send_to_player(username, "[RECORD] Not recording.\n")
+        else:
+            self.send_to_player(username, "Usage: record start [name], record stop, record status\n")
+            return False
+        return True
+    
+    def show_server_stats(self, username):
+        """Show connection counts and admission/eviction counters (admin)."""
+        with self.lock:
+            connections = len(self.connections)
+            online = len(self.client_sockets)
+        uptime = int(self.clock() - self.started_at)
+        counters = self.metrics.snapshot()
+        
+        msg = f"\n{'='*60}\n"
+        msg += "SERVER STATS\n"
+        msg += f"{'='*60}\n"
+        msg += f"  Uptime:      {uptime // 3600}h {uptime % 3600 // 60}m {uptime % 60}s\n"
+        msg += f"  Connections: {connections} open ({online} players, {connections - online} logging in)\n"
+        msg += f"  Spectators:  {len(self.spectators)}\n"
+        msg += f"  Limits:      {self.max_connections or 'no'} connections, "
+        msg += f"{self.max_connections_per_ip or 'no'} per address\n"
+        msg += f"  Timeouts:    login {self.login_timeout or 'off'}s, idle {self.idle_timeout or 'off'}s\n"
+        limits = ', '.join(f"{kind} {rate:g}/s (burst {burst})" for kind, (rate, burst) in self.rate_limits.items())
+        msg += f"  Rate limits: {limits or 'off'}\n"
+        msg += "\n"
+        for name in sorted(counters):
+            msg += f"  {name}: {counters[name]}\n"
+        msg += f"{'='*60}\n"
+        self.send_to_player(username, msg)
+    
+    def show_chat_stats(self, username):
+        """Show per-channel chat metrics (admin)."""
+        msg = f"\n{'='*60}\n"
+        msg += "CHAT METRICS\n"
+        msg += f"{'='*60}\n"
+        for name, stats in sorted(self.chat.stats().items()):
+            msg += (f"  {name}: {stats['subscribers']} subscribers, {stats['messages']} messages, "
+                    f"{stats['deliveries']} deliveries, {stats['bytes_out']} bytes, "
+                    f"{stats['rate_limited']} rate limited\n")
+        msg += f"{'='*60}\n"
+        self.send_to_player(username, msg)
+    
+    def render_static_texts(self, world):
+        """Render every static block (see static_content.py) for a world."""
+        texts = {"help": self.help_menu_text(), "shop": self.shop_text(world)}
+        for category in set(HELP_CATEGORIES.values()):
+            texts[f"help:{category}"] = self.get_help_category(category)
+        return texts
     
     def show_help(self, username, category=None):
         """Show help message with categories."""
         if category is None:
-            # Show category menu
-            msg = f"\n{'='*60}\n"
-            msg += "HELP MENU - Select a Category\n"
-            msg += f"{'='*60}\n\n"
-            msg += "  [1] Movement     - How to navigate the world\n"
-            msg += "  [2] Combat       - Fighting enemies and using spells\n"
-            msg += "  [3] Information  - Checking stats and surroundings\n"
-            msg += "  [4] Shopping     - Buying weapons and spells\n"
-            msg += "  [5] Social       - Interacting with other players\n"
-            msg += "  [6] All          - Show all commands\n\n"
-            msg += f"{'='*60}\n"
-            msg += "Usage: help <number> or help <category>\n"
-            msg += "Example: help 2  OR  help combat\n"
-            msg += f"{'='*60}\n"
-        else:
-            msg = self.get_help_category(category)
+            self.send_static(username, "help")
+            return
         
-        self.send_to_player(username, msg)
+        category = HELP_CATEGORIES.get(category.lower())
+        if category is None:
+            self.send_to_player(username, "Invalid category. Type 'help' to see available categories.\n")
+        else:
+            self.send_static(username, f"help:{category}")
+    
+    def help_menu_text(self):
+        """Render the help category menu."""
+        msg = f"\n{'='*60}\n"
+        msg += "HELP MENU - Select a Category\n"
+        msg += f"{'='*60}\n\n"
+        msg += "  [1] Movement     - How to navigate the world\n"
+        msg += "  [2] Combat       - Fighting enemies and using spells\n"
+        msg += "  [3] Information  - Checking stats and surroundings\n"
+        msg += "  [4] Shopping     - Buying weapons and spells\n"
+        msg += "  [5] Social       - Interacting with other players\n"
+        msg += "  [6] All          - Show all commands\n\n"
+        msg += f"{'='*60}\n"
+        msg += "Usage: help <number> or help <category>\n"
+        msg += "Example: help 2  OR  help combat\n"
+        msg += f"{'='*60}\n"
+        return msg
     
     def get_help_category(self, category):
         """Get help text for a specific category."""
-        category = category.lower()
-        
-        # Map numbers and names to categories
-        category_map = {
-            '1': 'movement', 'movement': 'movement',
-            '2': 'combat', 'combat': 'combat',
-            '3': 'information', 'info': 'information', 'information': 'information',
-            '4': 'shopping', 'shop': 'shopping', 'shopping': 'shopping',
-            '5': 'social', 'social': 'social',
-            '6': 'all', 'all': 'all'
-        }
-        
-        category = category_map.get(category, None)
+        category = HELP_CATEGORIES.get(category.lower())
         
         if category is None:
             return "Invalid category. Type 'help' to see available categories.\n"
@@ -619,6 +1996,8 @@ class GameServer:
             msg += "  south / s    - Move south\n"
             msg += "  east / e     - Move east\n"
             msg += "  west / w     - Move west\n"
+            msg += "  goto <place> - Travel to a location by the shortest route\n"
+            msg += "                 Example: goto dragon peak\n"
             if category != 'all':
                 msg += f"{'='*60}\n"
             else:
@@ -630,8 +2009,8 @@ class GameServer:
                 msg += f"{'='*60}\n"
             msg += "  attack <enemy>  - Attack an enemy in your location\n"
             msg += "                    Example: attack goblin\n"
-            msg += "  cast <spell>    - Cast a spell (requires mana)\n"
-            msg += "                    Example: cast fireball\n"
+            msg += "  cast <spell> [enemy] - Cast a spell (requires mana)\n"
+            msg += "                    Example: cast fireball goblin\n"
             if category != 'all':
                 msg += f"{'='*60}\n"
             else:
@@ -646,6 +2025,8 @@ class GameServer:
             msg += "  inventory    - View your inventory and equipment\n"
             msg += "  inv          - Shortcut for inventory\n"
             msg += "  players      - See all online players and locations\n"
+            msg += "  top [level|gold] [n]\n"
+            msg += "               - Show the leaderboard and your rank\n"
             if category != 'all':
                 msg += f"{'='*60}\n"
             else:
@@ -670,6 +2051,14 @@ class GameServer:
                 msg += f"{'='*60}\n"
             msg += "  say <message>   - Send a message to all players\n"
             msg += "                    Example: say Hello everyone!\n"
+            msg += "  local <message> - Talk to players in your location\n"
+            msg += "  whisper <player> <message>\n"
+            msg += "                  - Send a private message (alias: tell)\n"
+            msg += "  join <channel>  - Join (or create) a named channel\n"
+            msg += "  leave <channel> - Leave a named channel\n"
+            msg += "  chat <channel> <message>\n"
+            msg += "                  - Talk in a named channel\n"
+            msg += "  channels        - List your chat channels\n"
             if category != 'all':
                 msg += f"{'='*60}\n"
             else:
@@ -680,6 +2069,8 @@ class GameServer:
             msg += f"{'='*60}\n"
             msg += "  help            - Show help menu\n"
             msg += "  help <category> - Show help for specific category\n"
+            msg += "  cmd1; cmd2; ... - Run up to 10 commands in order, stopping\n"
+            msg += "                    at the first one that fails\n"
             msg += "  quit / exit     - Disconnect from server\n"
             msg += f"{'='*60}\n"
         else:
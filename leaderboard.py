@@ -0,0 +1,151 @@
+"""
+Leaderboard Module
+Keeps players ranked by level/EXP and by gold. Rankings are updated
+incrementally whenever a player's stats change, so reading the top N or a
+player's own rank never sorts the whole player list.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+BOARDS = ("level", "gold")
+
+BUCKET_SIZE = 512
+
+
+def board_key(board, username, player):
+    """Sort key for a player on a board; smaller keys rank higher."""
+    if board == "level":
+        return (-player['level'], -player['exp'], username)
+    return (-player['gold'], username)
+
+
+class BucketedSortedList:
+    """A sorted list split into small sorted buckets.
+
+    Inserts and removals only shift one bucket, and finding a rank costs one
+    bisect plus a sum over bucket lengths, which keeps both cheap with
+    hundreds of thousands of entries.
+    """
+
+    def __init__(self, bucket_size=BUCKET_SIZE):
+        self.bucket_size = bucket_size
+        self.buckets = []
+        self.maxes = []  # Last (largest) item of each bucket
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _locate(self, item):
+        index = bisect_left(self.maxes, item)
+        return min(index, len(self.buckets) - 1)
+
+    def add(self, item):
+        if not self.buckets:
+            self.buckets.append([item])
+            self.maxes.append(item)
+            self.size = 1
+            return
+
+        index = self._locate(item)
+        bucket = self.buckets[index]
+        insort(bucket, item)
+        self.maxes[index] = bucket[-1]
+        self.size += 1
+
+        if len(bucket) > 2 * self.bucket_size:
+            half = bucket[self.bucket_size:]
+            del bucket[self.bucket_size:]
+            self.buckets.insert(index + 1, half)
+            self.maxes[index] = bucket[-1]
+            self.maxes.insert(index + 1, half[-1])
+
+    def remove(self, item):
+        """Remove an item; raises ValueError if it is not present."""
+        if not self.buckets:
+            raise ValueError(item)
+        index = self._locate(item)
+        bucket = self.buckets[index]
+        position = bisect_left(bucket, item)
+        if position == len(bucket) or bucket[position] != item:
+            raise ValueError(item)
+
+        del bucket[position]
+        self.size -= 1
+        if bucket:
+            self.maxes[index] = bucket[-1]
+        else:
+            del self.buckets[index]
+            del self.maxes[index]
+
+    def index(self, item):
+        """Zero-based position of an item that is in the list."""
+        index = self._locate(item)
+        position = bisect_right(self.buckets[index], item) - 1
+        return sum(len(bucket) for bucket in self.buckets[:index]) + position
+
+    def head(self, count):
+        """The first count items, in order."""
+        items = []
+        for bucket in self.buckets:
+            items.extend(bucket[:count - len(items)])
+            if len(items) >= count:
+                break
+        return items
+
+
+class Leaderboard:
+    """Level and gold rankings for every known player."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rankings = {board: BucketedSortedList() for board in BOARDS}
+        self.keys = {board: {} for board in BOARDS}  # {board: {username: key}}
+
+    def update(self, username, player):
+        """Re-rank a player after their level, EXP or gold changed."""
+        with self.lock:
+            for board in BOARDS:
+                key = board_key(board, username, player)
+                old_key = self.keys[board].get(username)
+                if old_key == key:
+                    continue
+                if old_key is not None:
+                    self.rankings[board].remove(old_key)
+                self.rankings[board].add(key)
+                self.keys[board][username] = key
+
+    def rebuild(self, players):
+        """Rank a whole player dict from scratch (after a full load)."""
+        with self.lock:
+            for board in BOARDS:
+                keys = {username: board_key(board, username, player)
+                        for username, player in players.items()}
+                ranking = BucketedSortedList()
+                ordered = sorted(keys.values())
+                for start in range(0, len(ordered), ranking.bucket_size):
+                    bucket = ordered[start:start + ranking.bucket_size]
+                    ranking.buckets.append(bucket)
+                    ranking.maxes.append(bucket[-1])
+                ranking.size = len(ordered)
+                self.rankings[board] = ranking
+                self.keys[board] = keys
+
+    def top(self, board, count):
+        """[(rank, username, key), ...] for the best count players."""
+        with self.lock:
+            return [(rank, key[-1], key)
+                    for rank, key in enumerate(self.rankings[board].head(count), 1)]
+
+    def rank(self, board, username):
+        """1-based rank of a player, or None if they are not ranked."""
+        with self.lock:
+            key = self.keys[board].get(username)
+            if key is None:
+                return None
+            return self.rankings[board].index(key) + 1
+
+    def __len__(self):
+        return len(self.rankings[BOARDS[0]])
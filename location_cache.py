@@ -0,0 +1,136 @@
+"""
+Location Cache Module
+Renders the location block shown by 'look', moves, logins and respawns
+without rebuilding it every time:
+
+- the static parts of each location (name, description, exits) are rendered
+  once per world
+- a presence index records which players are in each location, kept up to
+  date as players are added or move
+- the rendered block, already encoded, is cached once per location and
+  only thrown away when someone enters or leaves that location, or its
+  enemies change. Its "Players here" list names everyone there; a viewer's
+  own name is cut out of it when the block is sent, so a crowded room costs
+  one list, not one per player in it
+"""
+
+import threading
+
+
+class LocationCache:
+    """Pre-rendered location blocks plus the presence index behind them."""
+
+    def __init__(self, world, describe_enemies):
+        self.describe_enemies = describe_enemies  # location_id -> "[!] Enemies: ..." line
+        self.lock = threading.Lock()
+        self.presence = {}  # {location_id: {username: None}}, in arrival order
+        self.rendered = {}  # {location_id: (text parts, encoded parts, name spans)}
+        self.set_world(world)
+
+    def set_world(self, world):
+        """Pre-render every location of a newly loaded world."""
+        static = {}
+        for location_id, loc in world.locations.items():
+            head = f"\n{'='*60}\n"
+            head += f"LOCATION: {loc['name']}\n"
+            head += f"{'='*60}\n"
+            head += f"{loc['description']}\n\n"
+            head += f"Exits: {', '.join(loc['exits'].keys())}\n"
+            static[location_id] = head
+        with self.lock:
+            self.static = static
+            self.rendered = {}
+
+    def reset(self, players, order=None):
+        """Rebuild the presence index from a whole players dict.
+
+        order ({location_id: [username, ...]}, as from export()) restores
+        each location's arrival order; players it does not place are added
+        after, in the order of players.
+        """
+        presence = {}
+        for location, usernames in (order or {}).items():
+            for username in usernames:
+                player = players.get(username)
+                if player is not None and player['location'] == location:
+                    presence.setdefault(location, {})[username] = None
+        for username, player in players.items():
+            presence.setdefault(player['location'], {}).setdefault(username, None)
+        with self.lock:
+            self.presence = presence
+            self.rendered = {}
+
+    def export(self):
+        """Each location's occupants in arrival order (see reset)."""
+        with self.lock:
+            return {location: list(occupants) for location, occupants in self.presence.items()}
+
+    def add(self, username, location):
+        """Record a player appearing in a location (new or loaded player)."""
+        with self.lock:
+            self.presence.setdefault(location, {})[username] = None
+            self.rendered.pop(location, None)
+
+    def move(self, username, old_location, new_location):
+        if old_location == new_location:
+            return
+        with self.lock:
+            occupants = self.presence.get(old_location)
+            if occupants is not None:
+                occupants.pop(username, None)
+                if not occupants:
+                    del self.presence[old_location]
+            self.presence.setdefault(new_location, {})[username] = None
+            self.rendered.pop(old_location, None)
+            self.rendered.pop(new_location, None)
+
+    def occupants(self, location, viewer=None):
+        """Usernames in a location, in arrival order, leaving out viewer."""
+        with self.lock:
+            return [username for username in self.presence.get(location, ()) if username != viewer]
+
+    def invalidate(self, location):
+        """Forget the rendered views of a location (e.g. its enemies changed)."""
+        with self.lock:
+            self.rendered.pop(location, None)
+
+    def render(self, location, viewer):
+        """(text, encoded bytes) of a location as seen by viewer."""
+        with self.lock:
+            view = self.rendered.get(location)
+            if view is None:
+                view = self.rendered[location] = self._render(location)
+        text_parts, encoded_parts, spans = view
+        span = spans.get(viewer)
+        return _assemble(text_parts, span and span[0]), _assemble(encoded_parts, span and span[1])
+
+    def _render(self, location):
+        """A location's block split around its list of names. Caller holds self.lock."""
+        names = list(self.presence.get(location, ()))
+        tail = self.describe_enemies(location) + f"{'='*60}\n"
+        text_parts = (self.static[location], ", ".join(names), tail)
+        encoded_parts = tuple(part.encode('utf-8') for part in text_parts)
+
+        # Where each name sits in the joined list, in characters and in bytes
+        spans = {}
+        offset = byte_offset = 0
+        for name in names:
+            size, byte_size = len(name), len(name.encode('utf-8'))
+            spans[name] = ((offset, offset + size), (byte_offset, byte_offset + byte_size))
+            offset += size + 2
+            byte_offset += byte_size + 2
+        return text_parts, encoded_parts, spans
+
+
+def _assemble(parts, span):
+    """head + "Players here" line + tail, leaving out the name at span (str or bytes)."""
+    head, names, tail = parts
+    if span is not None:
+        start, end = span
+        # Drop the name with the separator after it, or before it if it is last
+        names = names[end + 2:] if start == 0 else names[:start - 2] + names[end:]
+    if not names:
+        return head + tail
+    if isinstance(names, bytes):
+        return head + b"Players here: " + names + b"\n" + tail
+    return head + "Players here: " + names + "\n" + tail
@@ -0,0 +1,184 @@
+"""
+Memory Accounting Module
+Estimates how much memory each server subsystem holds (players, sockets,
+buffers, threads, ...) and wraps tracemalloc so admins can snapshot the heap
+and diff two snapshots to find leaks.
+"""
+
+import gc
+import socket
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def deep_size(obj):
+    """Approximate bytes held by obj and everything it references.
+
+    Follows dicts, lists, tuples and sets; each object is counted once.
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+def thread_stack_size():
+    """Bytes of address space reserved for each new thread's stack."""
+    size = threading.stack_size()
+    if size:
+        return size
+    if resource is not None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_STACK)
+        if soft > 0:
+            return soft
+    return 8 * 1024 * 1024
+
+
+def socket_buffer_size(sock):
+    """Kernel send + receive buffer sizes of a socket (0 if closed)."""
+    try:
+        return (sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF) +
+                sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF))
+    except OSError:
+        return 0
+
+
+def format_bytes(count):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(count) < 1024 or unit == "GiB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+class MemoryReporter:
+    """tracemalloc snapshots plus the per-subsystem breakdown."""
+
+    def __init__(self, frames=10):
+        self.frames = frames
+        self.snapshots = []  # [(label, tracemalloc.Snapshot)], oldest first
+        self.max_snapshots = 5
+
+    def start_tracing(self):
+        if tracemalloc.is_tracing():
+            return False
+        tracemalloc.start(self.frames)
+        return True
+
+    def stop_tracing(self):
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self.snapshots = []
+        return True
+
+    def take_snapshot(self, label):
+        """Record a tracemalloc snapshot; returns None if not tracing."""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        self.snapshots.append((label, snapshot))
+        del self.snapshots[:-self.max_snapshots]
+        return snapshot
+
+    def diff(self, top=10):
+        """Lines describing the biggest growth between the last two snapshots."""
+        if len(self.snapshots) < 2:
+            return ["Need two snapshots to diff (use 'mem snapshot' twice)."]
+        (old_label, old), (new_label, new) = self.snapshots[-2:]
+        lines = [f"Changes from '{old_label}' to '{new_label}':"]
+        for stat in new.compare_to(old, 'lineno')[:top]:
+            frame = stat.traceback[0]
+            lines.append(f"  {format_bytes(stat.size_diff):>10} ({stat.count_diff:+d} blocks)  "
+                         f"{frame.filename}:{frame.lineno}")
+        return lines
+
+    def top_allocations(self, top=10):
+        if not self.snapshots:
+            return []
+        stats = self.snapshots[-1][1].statistics('lineno')[:top]
+        return [f"  {format_bytes(stat.size):>10} ({stat.count} blocks)  "
+                f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}" for stat in stats]
+
+    def report(self, server):
+        """Per-subsystem memory estimate for a GameServer, as text lines."""
+        with server.lock:
+            players = list(server.players.items())
+            sockets = dict(server.client_sockets)
+            connections = dict(server.connections)
+            input_buffers = list(server.input_buffers.values())
+            sessions = (dict(server.sessions), dict(server.session_tokens))
+
+        players_size = deep_size(players)
+        socket_objects = sum(sys.getsizeof(sock) for sock in sockets.values())
+        kernel_buffers = sum(socket_buffer_size(sock) for sock in sockets.values())
+        buffered_input = deep_size(input_buffers)
+        chat_size = deep_size([(c.subscribers, c.recent) for c in list(server.chat.channels.values())])
+        stack_size = thread_stack_size()
+        thread_count = threading.active_count()
+
+        lines = [
+            f"players:         {format_bytes(players_size)} for {len(players)} players"
+            + (f" (~{format_bytes(players_size / len(players))} each)" if players else ""),
+            f"client sockets:  {len(sockets)} players, {len(connections) - len(sockets)} still logging in; "
+            f"{format_bytes(socket_objects)} of Python objects, {format_bytes(kernel_buffers)} of kernel buffer limits",
+            f"input buffers:   {format_bytes(buffered_input)} in {len(input_buffers)} partial lines",
+            f"sessions:        {format_bytes(deep_size(sessions))} for {len(sessions[0])} resume tokens",
+            f"chat channels:   {format_bytes(chat_size)} in {len(server.chat.channels)} channels",
+            f"leaderboard:     {format_bytes(deep_size(server.leaderboard.keys))}",
+            f"threads:         {thread_count} running, {format_bytes(stack_size)} stack reserved each "
+            f"({format_bytes(thread_count * stack_size)} address space)",
+        ]
+        if sockets:
+            per_connection = (socket_objects + kernel_buffers + buffered_input) / len(sockets)
+            lines.append(f"per connection:  ~{format_bytes(per_connection)} of socket and buffers, "
+                         f"plus {format_bytes(stack_size)} of reserved thread stack")
+
+        # Leak hints: open sockets no connection owns (e.g. left behind by a
+        # duplicate login) and handler threads that outlived their session
+        owned = {id(sock) for sock in connections}
+        owned.update(id(sock) for sock in server.spectators.sockets())
+        if server.server is not None:
+            owned.add(id(server.server))
+        if server.status_api is not None:
+            owned.add(id(server.status_api.httpd.socket))
+        objects = gc.get_objects()
+        orphans = [obj for obj in objects
+                   if isinstance(obj, socket.socket) and id(obj) not in owned and obj.fileno() != -1]
+        handler_threads = [thread for thread in threading.enumerate()
+                           if thread.name.endswith("(handle_client)")]
+        lines.append(f"orphan sockets:  {len(orphans)} open socket(s) not owned by any connection")
+        for orphan in orphans[:5]:
+            lines.append(f"                 {orphan!r}")
+        lines.append(f"handler threads: {len(handler_threads)} running for {len(connections)} connection(s)")
+        counts = Counter(type(obj).__name__ for obj in objects).most_common(6)
+        lines.append("gc objects:      " + ", ".join(f"{name} {count}" for name, count in counts))
+        del objects
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(f"tracemalloc:     {format_bytes(current)} traced now, {format_bytes(peak)} peak, "
+                         f"{len(self.snapshots)} snapshot(s) kept")
+        else:
+            lines.append("tracemalloc:     off (use 'mem trace start')")
+        return lines
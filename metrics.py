@@ -0,0 +1,30 @@
+"""
+Metrics Module
+Thread-safe named counters for server events (connections admitted and
+rejected, sessions evicted, ...). Counters only ever go up; reports show the
+totals since the server started.
+"""
+
+import threading
+from collections import Counter
+
+
+class Metrics:
+    """A set of counters that any thread may bump."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = Counter()
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def get(self, name):
+        with self.lock:
+            return self.counters[name]
+
+    def snapshot(self):
+        """A {name: value} copy of every counter."""
+        with self.lock:
+            return dict(self.counters)
@@ -0,0 +1,185 @@
+"""
+Profiler Module
+On-demand CPU profiling for a running server, in two flavours:
+
+- cProfile collection around every command the client handler threads run,
+  merged and dumped as a .pstats file
+- a low-overhead sampler that periodically captures the stacks of all
+  threads via sys._current_frames() and dumps collapsed stacks (one
+  "frame;frame;frame count" line per stack, ready for flamegraph tools)
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+
+# Before 3.12 a cProfile.Profile only sees the thread that enabled it, so
+# each handler thread gets its own. From 3.12 profiling is per interpreter
+# and a single enabled profile already covers every thread.
+PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+class ProfileManager:
+    """Starts, stops and dumps profiling sessions."""
+
+    def __init__(self, profiles_dir="profiles", sample_interval=0.005):
+        self.profiles_dir = profiles_dir
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+
+        self.cpu_active = False
+        self.cpu_started = None
+        self.cpu_profiles = []  # Every Profile created during this session
+        self.local = threading.local()
+        self.global_profile = None
+
+        self.sampler_thread = None
+        self.sampler_stop = threading.Event()
+        self.samples = Counter()
+        self.sample_count = 0
+        self.sampler_started = None
+
+    def _dump_path(self, prefix, extension):
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return os.path.join(self.profiles_dir, f"{prefix}_{timestamp}.{extension}")
+
+    # cProfile -----------------------------------------------------------
+
+    def start_cpu(self):
+        """Begin cProfile collection. Returns False if already running."""
+        with self.lock:
+            if self.cpu_active:
+                return False
+            self.cpu_profiles = []
+            self.cpu_started = time.monotonic()
+            self.local = threading.local()
+            if not PER_THREAD_PROFILES:
+                self.global_profile = cProfile.Profile()
+                self.cpu_profiles.append(self.global_profile)
+                self.global_profile.enable()
+            self.cpu_active = True
+            return True
+
+    @contextmanager
+    def command_scope(self):
+        """Profile the enclosed block on this thread while collection is on."""
+        if not self.cpu_active or not PER_THREAD_PROFILES:
+            yield
+            return
+
+        profile = getattr(self.local, "profile", None)
+        if profile is None:
+            profile = self.local.profile = cProfile.Profile()
+            with self.lock:
+                self.cpu_profiles.append(profile)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def stop_cpu(self):
+        """Stop cProfile collection and dump merged stats.
+
+        Returns the .pstats path, or None if nothing was running or no
+        command ran while collecting.
+        """
+        with self.lock:
+            if not self.cpu_active:
+                return None
+            self.cpu_active = False
+            if self.global_profile is not None:
+                self.global_profile.disable()
+                self.global_profile = None
+            profiles = self.cpu_profiles
+            self.cpu_profiles = []
+
+        stats = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            return None
+
+        path = self._dump_path("cpu", "pstats")
+        stats.dump_stats(path)
+        return path
+
+    # Sampling -------------------------------------------------------------
+
+    def start_sampler(self, interval=None):
+        """Begin stack sampling. Returns False if already running."""
+        with self.lock:
+            if self.sampler_thread is not None:
+                return False
+            if interval is not None:
+                self.sample_interval = interval
+            self.samples = Counter()
+            self.sample_count = 0
+            self.sampler_started = time.monotonic()
+            self.sampler_stop.clear()
+            self.sampler_thread = threading.Thread(target=self.sample_loop, name="profile-sampler")
+            self.sampler_thread.daemon = True
+            self.sampler_thread.start()
+            return True
+
+    def sample_loop(self):
+        own_id = threading.get_ident()
+        while not self.sampler_stop.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def stop_sampler(self):
+        """Stop sampling and dump collapsed stacks. Returns the path or None."""
+        with self.lock:
+            thread = self.sampler_thread
+            self.sampler_thread = None
+        if thread is None:
+            return None
+        self.sampler_stop.set()
+        thread.join()
+
+        path = self._dump_path("sample", "collapsed")
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    # Reporting --------------------------------------------------------------
+
+    def status(self):
+        """One line per profiler describing what is running."""
+        now = time.monotonic()
+        lines = []
+        if self.cpu_active:
+            lines.append(f"cpu: collecting for {now - self.cpu_started:.0f}s "
+                         f"({len(self.cpu_profiles)} thread profile(s))")
+        else:
+            lines.append("cpu: stopped")
+        if self.sampler_thread is not None:
+            lines.append(f"sampler: running for {now - self.sampler_started:.0f}s, "
+                         f"{self.sample_count} samples every {self.sample_interval * 1000:.0f}ms")
+        else:
+            lines.append("sampler: stopped")
+        return lines
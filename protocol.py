@@ -0,0 +1,156 @@
+"""
+Protocol Module
+Game output as structured events. Handlers describe what happened as an
+event name plus fields (status, combat_round, victory, ...); how it reaches
+the player depends on the protocol the connection chose at login:
+
+- text (default): the event is rendered to the usual human-readable text
+- json: each event is a JSON object {"event": name, ...fields} sent as a
+  4-byte big-endian length followed by that many bytes of UTF-8 JSON
+- binary: each event is a 1-byte event code and a 4-byte big-endian payload
+  length, then the payload. The most frequent events are packed: their
+  integer fields as big-endian int32s in a fixed order, then their string
+  fields, each as a 2-byte length and UTF-8 bytes. Code 0 carries any other
+  event as a JSON object, like the json protocol.
+
+A client chooses a protocol by sending "@proto json" or "@proto binary" in
+place of (or before) its username; the server answers with a "proto" event
+in that protocol and frames everything it sends from then on. Plain server
+text, such as chat, arrives as a "message" event with a "text" field.
+"""
+
+import json
+import struct
+
+
+PROTO_COMMAND = "@proto"
+PROTOCOL_VERSION = 1
+PROTOCOLS = ("text", "json", "binary")
+
+JSON_HEADER = struct.Struct(">I")
+BINARY_HEADER = struct.Struct(">BI")
+STRING_LENGTH = struct.Struct(">H")
+
+# Packed binary events: name -> (code, integer fields, string fields)
+BINARY_EVENTS = {
+    "status": (1, ("level", "hp", "max_hp", "mana", "max_mana", "exp", "exp_to_level",
+                   "gold", "weapon_damage", "spells"), ("user", "weapon")),
+    "combat_round": (2, ("dmg", "enemy_hp"), ()),
+    "combat_hit": (3, ("dmg", "hp"), ()),
+}
+BINARY_STRUCTS = {name: struct.Struct(f">{len(ints)}i") for name, (_, ints, _) in BINARY_EVENTS.items()}
+BINARY_CODES = {code: name for name, (code, _, _) in BINARY_EVENTS.items()}
+
+
+# Text rendering ---------------------------------------------------------------
+
+def _render_status(f):
+    msg = f"\n{'='*60}\n"
+    msg += f"CHARACTER: {f['user']} - Level {f['level']} Adventurer\n"
+    msg += f"{'='*60}\n"
+    msg += f"Health: {f['hp']}/{f['max_hp']}\n"
+    msg += f"Mana: {f['mana']}/{f['max_mana']}\n"
+    msg += f"EXP: {f['exp']}/{f['exp_to_level']}\n"
+    msg += f"Gold: {f['gold']}\n"
+    msg += f"Weapon: {f['weapon']} (Damage: {f['weapon_damage']})\n"
+    msg += f"Spells: {f['spells']}\n"
+    msg += f"{'='*60}\n"
+    return msg
+
+
+def _render_victory(f):
+    msg = f"\n[VICTORY] You gained {f['exp']} EXP and {f['gold']} gold!\n"
+    msg += (f"\n[INFO] You now have {f['hp']} health, {f['mana']} mana, "
+            f"{f['total_gold']} gold, and {f['total_exp']} EXP.\n")
+    return msg
+
+
+def _render_level_up(f):
+    msg = f"\n*** LEVEL UP! You are now level {f['level']}! ***\n"
+    msg += f"Max Health: +20 (now {f['max_hp']})\n"
+    msg += f"Max Mana: +10 (now {f['max_mana']})\n"
+    return msg
+
+
+TEXT_RENDERERS = {
+    "message": lambda f: f["text"],
+    "status": _render_status,
+    "combat_start": lambda f: f"\n[COMBAT] Battle started with {f['enemy']}!\n",
+    "combat_round": lambda f: f"You strike for {f['dmg']} damage! Enemy health: {f['enemy_hp']}\n",
+    "combat_hit": lambda f: f"Enemy hits you for {f['dmg']} damage! Your health: {f['hp']}\n",
+    "victory": _render_victory,
+    "defeat": lambda f: "\n[DEFEAT] You were defeated! You wake up in the town square with reduced gold.\n",
+    "level_up": _render_level_up,
+    "spell_heal": lambda f: f"[SPELL] You cast {f['spell']} and restore {f['amount']} health!\n",
+    "spell_hit": lambda f: (f"[SPELL] You cast {f['spell']} at the {f['enemy']} for {f['dmg']} damage! "
+                            f"Enemy health: {f['enemy_hp']}\n"),
+}
+
+
+def render_text(event, fields):
+    """The human-readable text for an event."""
+    return TEXT_RENDERERS[event](fields)
+
+
+# Encoding -----------------------------------------------------------------------
+
+def _encode_json(event, fields):
+    return json.dumps(dict(fields, event=event), separators=(",", ":")).encode('utf-8')
+
+
+def encode_event(protocol, event, fields):
+    """One framed event for a "json" or "binary" connection."""
+    if protocol == "json":
+        body = _encode_json(event, fields)
+        return JSON_HEADER.pack(len(body)) + body
+
+    spec = BINARY_EVENTS.get(event)
+    if spec is None:
+        body = _encode_json(event, fields)
+        return BINARY_HEADER.pack(0, len(body)) + body
+    code, ints, strings = spec
+    parts = [BINARY_STRUCTS[event].pack(*[fields[name] for name in ints])]
+    for name in strings:
+        data = fields[name].encode('utf-8')
+        parts.append(STRING_LENGTH.pack(len(data)))
+        parts.append(data)
+    body = b"".join(parts)
+    return BINARY_HEADER.pack(code, len(body)) + body
+
+
+def decode_events(protocol, data):
+    """Split received bytes into events; returns (events, unconsumed bytes).
+
+    For clients and tools: each event comes back as a dict with its name
+    under "event", whichever protocol carried it.
+    """
+    events = []
+    view = memoryview(data)
+    offset = 0
+    header = JSON_HEADER if protocol == "json" else BINARY_HEADER
+    while len(view) - offset >= header.size:
+        if protocol == "json":
+            code, (length,) = 0, header.unpack_from(view, offset)
+        else:
+            code, length = header.unpack_from(view, offset)
+        start = offset + header.size
+        if len(view) - start < length:
+            break
+        body = view[start:start + length]
+        offset = start + length
+
+        if code == 0:
+            events.append(json.loads(bytes(body).decode('utf-8')))
+            continue
+        name = BINARY_CODES[code]
+        _, ints, strings = BINARY_EVENTS[name]
+        packed = BINARY_STRUCTS[name]
+        event = dict(zip(ints, packed.unpack_from(body)), event=name)
+        position = packed.size
+        for field in strings:
+            (size,) = STRING_LENGTH.unpack_from(body, position)
+            position += STRING_LENGTH.size
+            event[field] = bytes(body[position:position + size]).decode('utf-8')
+            position += size
+        events.append(event)
+    return events, bytes(view[offset:])
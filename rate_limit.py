@@ -0,0 +1,141 @@
+"""
+Rate Limit Module
+Token buckets that cap how fast one connection may send commands. Commands
+fall into classes (movement, combat, chat, info) and every connection has a
+bucket per class: each command takes a token, tokens refill at a steady
+rate, and a full bucket allows a short burst. A command that finds its
+bucket empty is rejected (throttled).
+
+Every rejection also takes a token from the connection's strike bucket;
+a client that keeps hammering after being throttled empties it and is
+disconnected.
+"""
+
+import time
+
+
+# Command class of each command; anything not listed counts as "info"
+COMMAND_CLASSES = {
+    'north': 'movement', 'south': 'movement', 'east': 'movement', 'west': 'movement',
+    'n': 'movement', 's': 'movement', 'e': 'movement', 'w': 'movement', 'goto': 'movement',
+    'attack': 'combat', 'cast': 'combat',
+    'say': 'chat', 'local': 'chat', 'whisper': 'chat', 'tell': 'chat',
+    'join': 'chat', 'leave': 'chat', 'chat': 'chat',
+}
+
+# Per class: (tokens added per second, bucket size)
+DEFAULT_LIMITS = {
+    "movement": (5.0, 15),
+    "combat": (2.0, 6),
+    "chat": (1.0, 5),
+    "info": (4.0, 12),
+}
+
+# Rejections a connection may rack up (refilling one per second) before it
+# is disconnected; 0 never disconnects
+DEFAULT_STRIKES = 30
+
+
+def command_class(command):
+    return COMMAND_CLASSES.get(command, 'info')
+
+
+def parse_limits(spec):
+    """Limits from a "class=rate/burst,..." string, e.g. "chat=0.5/3,combat=1/4".
+
+    Classes not mentioned keep their defaults. Raises ValueError if the
+    string is malformed.
+    """
+    limits = dict(DEFAULT_LIMITS)
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, _, value = entry.partition("=")
+        name = name.strip()
+        rate, _, burst = value.partition("/")
+        if name not in DEFAULT_LIMITS or not burst:
+            raise ValueError(f"bad rate limit '{entry.strip()}' (expected class=rate/burst, "
+                             f"class one of {', '.join(DEFAULT_LIMITS)})")
+        limits[name] = (float(rate), int(burst))
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def export(self, now):
+        """[rate, capacity, tokens, last update relative to now]."""
+        return [self.rate, self.capacity, self.tokens, self.updated - now]
+
+    @classmethod
+    def restore(cls, state, now):
+        rate, capacity, tokens, updated = state
+        bucket = cls(rate, capacity, now + updated)
+        bucket.tokens = tokens
+        return bucket
+
+    def take(self, now):
+        """Take a token; returns 0.0, or the seconds until one is available."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1.0 - self.tokens) / self.rate
+
+
+class ConnectionLimiter:
+    """The buckets of one connection."""
+
+    def __init__(self, limits=None, strikes=DEFAULT_STRIKES, clock=time.monotonic):
+        self.clock = clock
+        now = clock()
+        self.buckets = {name: TokenBucket(rate, burst, now)
+                        for name, (rate, burst) in (limits or DEFAULT_LIMITS).items()}
+        self.strikes = TokenBucket(1.0, strikes, now) if strikes else None
+        self.exceeded = False  # Set once the strike bucket runs dry
+
+    def check(self, command):
+        """Charge a command to its class's bucket.
+
+        Returns (command class, seconds to wait); 0.0 means the command may
+        run. A rejection also costs a strike and may set self.exceeded.
+        """
+        name = command_class(command)
+        bucket = self.buckets.get(name)
+        if bucket is None:
+            return name, 0.0
+        now = self.clock()
+        wait = bucket.take(now)
+        if wait and self.strikes is not None and self.strikes.take(now):
+            self.exceeded = True
+        return name, wait
+
+    def export(self):
+        """The buckets' state, with times relative to the clock's reading."""
+        now = self.clock()
+        return {
+            "buckets": {name: bucket.export(now) for name, bucket in self.buckets.items()},
+            "strikes": None if self.strikes is None else self.strikes.export(now),
+            "exceeded": self.exceeded,
+        }
+
+    @classmethod
+    def restore(cls, state, clock=time.monotonic):
+        """A limiter carrying on from what export() returned."""
+        limiter = cls({}, 0, clock)
+        now = clock()
+        limiter.buckets = {name: TokenBucket.restore(bucket, now)
+                           for name, bucket in state["buckets"].items()}
+        if state["strikes"] is not None:
+            limiter.strikes = TokenBucket.restore(state["strikes"], now)
+        limiter.exceeded = state["exceeded"]
+        return limiter
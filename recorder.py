@@ -0,0 +1,173 @@
+"""
+Session Recorder
+Records everything needed to reproduce a stretch of server traffic: the
+player and enemy state when recording began, every login (with the seed of the
+session's random number generator and the connection's protocol and cached
+static blocks), every accepted command and '@cache' update with its time
+offset, and every logout. The recording is a JSON-lines file that
+replay.py feeds back into a headless GameServer.
+
+While a recording is active, commands run one at a time in the order they
+are recorded, so a replay applies them in exactly the same order. Each turn
+reads the clock once: the server's clock returns that reading for the whole
+turn, so rate limits and respawns see the very time the recording stores.
+Network sends made during a turn are held back and made once the turn is
+released, so a slow client never keeps everyone else's turns waiting.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+FORMAT_VERSION = 3
+
+
+def state_digest(players):
+    """Short stable hash of a players dict, for comparing end states."""
+    encoded = json.dumps(players, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class TurnClock:
+    """Wraps a clock so it reads the same time for the whole of a turn."""
+
+    def __init__(self, clock):
+        self.source = clock
+        self.local = threading.local()
+
+    def __call__(self):
+        now = getattr(self.local, 'now', None)
+        return self.source() if now is None else now
+
+    @contextmanager
+    def frozen(self):
+        """Fix this thread's reading of the clock until the block ends.
+
+        Nested blocks keep the reading of the outermost one.
+        """
+        previous = getattr(self.local, 'now', None)
+        if previous is None:
+            self.local.now = self.source()
+        try:
+            yield
+        finally:
+            self.local.now = previous
+
+
+class SessionRecorder:
+    """Writes recording records; inactive (and free) until started.
+
+    self.clock is the clock everything recorded should read (see TurnClock).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = TurnClock(clock)
+        self.lock = threading.RLock()  # Held for every recorded turn; admins stop recordings from inside one
+        self.local = threading.local()  # Sends held back during this thread's turn
+        self.file = None
+        self.path = None
+        self.started = None
+        self.records = 0
+
+    @property
+    def active(self):
+        return self.file is not None
+
+    @contextmanager
+    def turn(self):
+        """Serialize the enclosed block with every other recorded turn.
+
+        Yields True if the block should be recorded. When no recording is
+        running this costs a single attribute check.
+        """
+        if self.file is None:
+            yield False
+            return
+        if getattr(self.local, 'held', None) is not None:
+            # Nested in a turn this thread already holds
+            yield self.file is not None
+            return
+        held = self.local.held = []
+        try:
+            with self.lock, self.clock.frozen():
+                yield self.file is not None
+        finally:
+            self.local.held = None
+            for action in held:
+                action()
+
+    def defer(self, action):
+        """Hold action back until this thread's turn is released.
+
+        Returns False (and does nothing) outside a recorded turn.
+        """
+        held = getattr(self.local, 'held', None)
+        if held is None:
+            return False
+        held.append(action)
+        return True
+
+    def start(self, path, snapshot):
+        """Begin recording to path.
+
+        snapshot() is called with no turn in progress and returns
+        (header, sessions): header holds the starting state ("world",
+        "players", "enemies", "presence") and sessions lists the players already online
+        as {"user", "seed", "channels", "protocol", "cache", "limiter", "chat_rates"} dicts.
+        The clock is frozen throughout, so times the snapshot stores relative
+        to its reading are relative to the recording's t=0. Returns False if
+        a recording is already running.
+        """
+        with self.lock, self.clock.frozen():
+            if self.file is not None:
+                return False
+            header, sessions = snapshot()
+            self.file = open(path, 'w')
+            self.path = path
+            self.started = self.clock()
+            self.records = 0
+            self._write(dict(header, type="start", version=FORMAT_VERSION,
+                             recorded_at=datetime.now().isoformat()))
+            for session in sessions:
+                self._write(dict(session, type="attach"))
+            return True
+
+    def stop(self, players_snapshot):
+        """End the recording with a digest of the final state.
+
+        players_snapshot() is called with no turn in progress. Returns
+        (path, records, digest), or None if nothing was being recorded.
+        """
+        with self.lock:
+            if self.file is None:
+                return None
+            digest = state_digest(players_snapshot())
+            self._write({"type": "end", "digest": digest})
+            self.file.close()
+            self.file = None
+            return self.path, self.records, digest
+
+    # Records (call inside a turn that yielded True) ---------------------------
+
+    def login(self, username, seed, resumed, connection=None):
+        """connection: {"protocol", "cache"} of the socket (see GameServer.connection_state)."""
+        self._write(dict(connection or {}, type="login", user=username, seed=seed, resumed=resumed))
+
+    def command(self, username, command):
+        self._write({"type": "command", "user": username, "command": command})
+
+    def cache(self, username, line):
+        self._write({"type": "cache", "user": username, "line": line})
+
+    def logout(self, username):
+        self._write({"type": "logout", "user": username})
+
+    def _write(self, record):
+        record["t"] = round(self.clock() - self.started, 6)
+        self.file.write(json.dumps(record, separators=(',', ':')) + "\n")
+        self.file.flush()
+        self.records += 1
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Replay Tool
+Feeds a recording made with the admin 'record' command back into a
+headless GameServer (no sockets, threads or signal handlers) and checks
+that it ends in the same world state. Every random roll comes from the
+recorded per-session seeds and every timestamp from the recording, so a
+replay reproduces the same state and the same output each time. Replaying
+production traffic against a new build doubles as a benchmark.
+
+Usage:
+    python replay.py <recording.jsonl> [--realtime] [--world <world.json>] [--transcripts <dir>]
+
+--realtime      wait between commands as long as the recorded session did
+                (default: run as fast as possible)
+--world         world file the server was using, if not game_data.py
+--transcripts   write everything each player was sent to <dir>/<player>.txt
+
+Admin commands in a recording are rejected during a replay, since the
+replay server has no admins.
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+from game_log import GameLogger
+from game_server import GameServer
+from rate_limit import ConnectionLimiter
+from recorder import FORMAT_VERSION, state_digest
+
+
+REPLAY_ADDRESS = ("replay", 0)
+
+
+class CaptureSocket:
+    """Stands in for a client socket and keeps everything sent to it."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def send(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def sendall(self, data):
+        self.chunks.append(bytes(data))
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayClock:
+    """A clock that reads whatever time the replay has reached."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayServer(GameServer):
+    """A GameServer that is only driven through its session methods."""
+
+    def __init__(self, world_file=None, clock=None):
+        super().__init__(host="replay", port=0, world_file=world_file,
+                         log=GameLogger(level="warning"), clock=clock,
+                         install_signal_handlers=False)
+        self.tokens_issued = 0
+
+    def generate_token(self):
+        # Deterministic, so transcripts match from one replay to the next
+        self.tokens_issued += 1
+        return f"replay-{self.tokens_issued}"
+
+    def prepare_connection(self, client_socket, record):
+        """Give a replayed socket the protocol and cached blocks it had live."""
+        with self.lock:
+            if record.get("protocol"):
+                self.protocols[client_socket] = record["protocol"]
+            if record.get("cache") is not None:
+                self.client_caches[client_socket] = dict(record["cache"])
+
+    def attach_session(self, username, client_socket, seed, channels, limiter=None, chat_rates=None):
+        """Recreate a session that was already online when recording began."""
+        with self.lock:
+            self.claim_session(username, client_socket)
+            self.issue_resume_token(username)
+            self.rngs[username] = random.Random(seed)
+            if limiter is not None:
+                self.rate_limiters[client_socket] = ConnectionLimiter.restore(limiter, self.clock)
+            location = self.players[username]['location']
+        self.chat.connect(username, location)
+        for name in channels:
+            self.chat.join(username, name)
+        if chat_rates:
+            self.chat.restore_rates(username, chat_rates)
+
+
+def read_recording(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def replay(path, realtime=False, world_file=None):
+    """Replay a recording; returns a dict describing the result."""
+    records = read_recording(path)
+    start = next(records, None)
+    if start is None or start.get("type") != "start":
+        raise ValueError(f"{path} is not a recording (missing start record)")
+    if start.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has recording format {start.get('version')}, expected {FORMAT_VERSION}")
+
+    clock = ReplayClock()
+    server = ReplayServer(world_file, clock)
+    server.players = start["players"]
+    server.location_views.reset(server.players, start.get("presence"))
+    server.enemies.restore(start["enemies"])
+    server.leaderboard.rebuild(server.players)
+
+    sockets = {}  # {username: CaptureSocket of the current session}
+    outputs = {}  # {username: [CaptureSocket, ...] for every session}
+    latencies = []
+    errors = 0
+    expected = None
+    began = time.perf_counter()
+
+    for record in records:
+        kind = record["type"]
+        clock.now = record["t"]
+        if realtime:
+            delay = began + record["t"] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        if kind in ("attach", "login"):
+            user = record["user"]
+            sock = sockets[user] = CaptureSocket()
+            outputs.setdefault(user, []).append(sock)
+            server.prepare_connection(sock, record)
+            if kind == "attach":
+                server.attach_session(user, sock, record["seed"], record.get("channels", []),
+                                      record.get("limiter"), record.get("chat_rates"))
+            else:
+                server.start_session(user, sock, REPLAY_ADDRESS, record["resumed"], seed=record["seed"])
+        elif kind == "command":
+            started = time.perf_counter()
+            try:
+                server.run_command(record["user"], record["command"])
+            except Exception as e:
+                errors += 1
+                print(f"[REPLAY] {record['user']}: '{record['command']}' raised {e!r}")
+            latencies.append(time.perf_counter() - started)
+        elif kind == "cache":
+            server.update_cache(record["user"], sockets[record["user"]], record["line"])
+        elif kind == "logout":
+            server.end_session(record["user"], sockets.pop(record["user"]), REPLAY_ADDRESS)
+        elif kind == "end":
+            expected = record["digest"]
+
+    elapsed = time.perf_counter() - began
+    transcripts = {user: b"".join(b"".join(sock.chunks) for sock in socks)
+                   for user, socks in outputs.items()}
+    output_hash = hashlib.sha256()
+    for user in sorted(transcripts):
+        output_hash.update(user.encode('utf-8') + b"\0" + transcripts[user] + b"\0")
+    latencies.sort()
+
+    return {
+        "world_matches": start["world"] == server.world.digest,
+        "commands": len(latencies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": latencies[-1] if latencies else 0.0,
+        "digest": state_digest(server.players),
+        "expected_digest": expected,
+        "output_digest": output_hash.hexdigest()[:16],
+        "transcripts": transcripts,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    realtime = False
+    world_file = None
+    transcripts_dir = None
+    paths = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--realtime":
+            realtime = True
+        elif arg == "--world":
+            world_file = next(args, None)
+        elif arg == "--transcripts":
+            transcripts_dir = next(args, None)
+        else:
+            paths.append(arg)
+    if len(paths) != 1 or (world_file is None and "--world" in argv) or \
+            (transcripts_dir is None and "--transcripts" in argv):
+        print(__doc__.strip())
+        return 1
+
+    result = replay(paths[0], realtime=realtime, world_file=world_file)
+
+    if not result["world_matches"]:
+        print("[WARNING] World data differs from the recording; state may not match.")
+    rate = result["commands"] / result["elapsed"] if result["elapsed"] else 0.0
+    print(f"Replayed {result['commands']} commands in {result['elapsed']:.3f}s ({rate:.0f} commands/s)")
+    print(f"Command latency: p50 {result['latency_p50'] * 1000:.3f}ms, "
+          f"p99 {result['latency_p99'] * 1000:.3f}ms, max {result['latency_max'] * 1000:.3f}ms")
+    if result["errors"]:
+        print(f"Commands that raised: {result['errors']}")
+    print(f"Output digest: {result['output_digest']}")
+
+    if transcripts_dir:
+        os.makedirs(transcripts_dir, exist_ok=True)
+        for user, data in result["transcripts"].items():
+            with open(os.path.join(transcripts_dir, f"{user}.txt"), 'wb') as f:
+                f.write(data)
+        print(f"Transcripts written to {transcripts_dir}/")
+
+    if result["expected_digest"] is None:
+        print(f"State digest: {result['digest']} (recording has no end record to compare with)")
+        return 0
+    if result["digest"] != result["expected_digest"]:
+        print(f"[MISMATCH] State digest {result['digest']}, recording ended with {result['expected_digest']}")
+        return 2
+    print(f"[OK] State digest {result['digest']} matches the recording")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
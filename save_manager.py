@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Save Manager
+Keeps a versioned history of every save. Each snapshot is stored as a
+gzip-compressed delta against the previous one (with a full base every few
+snapshots), so history grows with how much changed rather than with how
+often the world is saved. Retention policies prune old snapshots, and a
+diff tool shows per-player changes between any two saves.
+
+Usage:
+    python save_manager.py list <world>
+    python save_manager.py diff <save_a> <save_b>
+    python save_manager.py restore <world> <snapshot_id> <output.tms>
+    python save_manager.py prune [--dry-run]
+
+A save is either a .tms file (in saves/ or a path) or a snapshot written
+as <world>@<snapshot_id>, e.g. autosave@12.
+"""
+
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from datetime import datetime
+
+from save_stream import iter_save
+from sharded_save import ShardedSaves, read_manifest
+
+
+HISTORY_DIR = "history"
+MANIFEST = "manifest.json"
+
+
+class RetentionPolicy:
+    """Which snapshots to keep: the last N, plus the newest per hour and per day."""
+
+    def __init__(self, keep_last=10, hourly=24, daily=7):
+        self.keep_last = keep_last
+        self.hourly = hourly
+        self.daily = daily
+
+    def select(self, entries):
+        """Return the ids of entries to keep. entries are oldest first."""
+        keep = {entry["id"] for entry in entries[-self.keep_last:]}
+        if not entries:
+            return keep
+
+        newest = _parse_time(entries[-1]["saved_at"])
+        for period, count in (("%Y%m%d%H", self.hourly), ("%Y%m%d", self.daily)):
+            seen = set()
+            for entry in reversed(entries):
+                saved_at = _parse_time(entry["saved_at"])
+                bucket = saved_at.strftime(period)
+                if bucket in seen:
+                    continue
+                seen.add(bucket)
+                if len(seen) > count:
+                    break
+                keep.add(entry["id"])
+
+        # The newest snapshot is always kept
+        keep.add(entries[-1]["id"])
+        return keep
+
+    def __repr__(self):
+        return f"RetentionPolicy(keep_last={self.keep_last}, hourly={self.hourly}, daily={self.daily})"
+
+
+def _parse_time(text):
+    try:
+        return datetime.fromisoformat(text)
+    except (TypeError, ValueError):
+        return datetime.min
+
+
+def player_digest(player):
+    """Cheap fingerprint of a player's data, used to find what changed."""
+    return zlib.crc32(json.dumps(player, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+
+
+def make_delta(previous_digests, game_state, digests=None):
+    """Delta holding only the players that differ from previous_digests.
+
+    digests, if given, holds the player_digest of every player in
+    game_state, so they need not be computed again.
+    """
+    players = game_state.get("players", {})
+    if digests is None:
+        digests = {username: player_digest(player) for username, player in players.items()}
+    changed = {}
+    for username, player in players.items():
+        if previous_digests.get(username) != digests[username]:
+            changed[username] = player
+    removed = [username for username in previous_digests if username not in players]
+    meta = {key: value for key, value in game_state.items() if key != "players"}
+    return {"meta": meta, "changed": changed, "removed": removed}
+
+
+def apply_delta(state, delta):
+    """Apply a delta to a full state in place and return it."""
+    players = state.setdefault("players", {})
+    for username in delta["removed"]:
+        players.pop(username, None)
+    players.update(delta["changed"])
+    for key, value in delta["meta"].items():
+        state[key] = value
+    return state
+
+
+def merge_deltas(first, second):
+    """One delta with the effect of applying first and then second."""
+    changed = dict(first["changed"])
+    removed = set(first["removed"])
+    for username in second["removed"]:
+        changed.pop(username, None)
+        removed.add(username)
+    for username, player in second["changed"].items():
+        changed[username] = player
+        removed.discard(username)
+    return {"meta": second["meta"], "changed": changed, "removed": sorted(removed)}
+
+
+def diff_states(old, new):
+    """Per-player differences between two game states.
+
+    Returns {"added": [...], "removed": [...], "changed": {username:
+    {field: (old, new)}}}.
+    """
+    old_players = old.get("players", {})
+    new_players = new.get("players", {})
+    changed = {}
+    for username in old_players.keys() & new_players.keys():
+        before, after = old_players[username], new_players[username]
+        if before == after:
+            continue
+        fields = {}
+        for field in sorted(before.keys() | after.keys()):
+            if before.get(field) != after.get(field):
+                fields[field] = (before.get(field), after.get(field))
+        changed[username] = fields
+    return {
+        "added": sorted(new_players.keys() - old_players.keys()),
+        "removed": sorted(old_players.keys() - new_players.keys()),
+        "changed": dict(sorted(changed.items())),
+    }
+
+
+def _write_json_gz(path, data):
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _read_json_gz(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class SaveManager:
+    """Snapshot history for the worlds in a saves directory.
+
+    Each world (save file name without .tms) gets saves/history/<world>/
+    with a manifest and one compressed file per snapshot.
+    """
+
+    def __init__(self, saves_dir="saves", policy=None, max_chain=20):
+        self.saves_dir = saves_dir
+        self.policy = policy or RetentionPolicy()
+        self.max_chain = max_chain  # Deltas allowed before a fresh base
+        self.lock = threading.Lock()
+        self.digests = {}  # {world: {username: digest}} of the newest snapshot
+        # Snapshots waiting for the history thread (see record_later)
+        self.pending = {}  # {world: (game_state, callback)}
+        self.pending_changed = threading.Condition()
+        self.recording = False
+        self.worker = None
+
+    def history_dir(self, world):
+        return os.path.join(self.saves_dir, HISTORY_DIR, world)
+
+    def load_manifest(self, world):
+        path = os.path.join(self.history_dir(world), MANIFEST)
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r') as f:
+            return json.load(f)["snapshots"]
+
+    def write_manifest(self, world, entries):
+        path = os.path.join(self.history_dir(world), MANIFEST)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"world": world, "snapshots": entries}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _entry_path(self, world, entry):
+        return os.path.join(self.history_dir(world), entry["file"])
+
+    def record(self, world, game_state):
+        """Add a snapshot of game_state to the world's history.
+
+        Returns the new snapshot id. Retention is applied afterwards.
+        """
+        # Fingerprint each player once; used for the delta and kept for the next one
+        digests = {u: player_digest(p) for u, p in game_state.get("players", {}).items()}
+        with self.lock:
+            os.makedirs(self.history_dir(world), exist_ok=True)
+            entries = self.load_manifest(world)
+            previous = self.digests.get(world)
+            if previous is None and entries:
+                latest = self.reconstruct(world, entries, entries[-1]["id"])
+                previous = {u: player_digest(p) for u, p in latest.get("players", {}).items()}
+
+            chain = 0
+            for entry in reversed(entries):
+                if entry["kind"] == "base":
+                    break
+                chain += 1
+
+            snapshot_id = entries[-1]["id"] + 1 if entries else 1
+            if previous is None or chain >= self.max_chain:
+                kind, data = "base", game_state
+            else:
+                kind, data = "delta", make_delta(previous, game_state, digests)
+
+            entry = {
+                "id": snapshot_id,
+                "kind": kind,
+                "file": f"{snapshot_id:06d}.{kind}.json.gz",
+                "saved_at": game_state.get("saved_at", datetime.now().isoformat()),
+                "players": len(game_state.get("players", {})),
+            }
+            if kind == "delta":
+                entry["changed"] = len(data["changed"])
+                entry["removed"] = len(data["removed"])
+            _write_json_gz(self._entry_path(world, entry), data)
+            entries.append(entry)
+            self.write_manifest(world, entries)
+            self.digests[world] = digests
+
+            self.compact(world, entries)
+            return snapshot_id
+
+    def record_later(self, world, game_state, callback=None):
+        """Record a snapshot on the history thread instead of the caller's.
+
+        Saves of a world that queue up while the thread is busy replace one
+        another: only the newest is recorded. callback(snapshot_id, error)
+        is called on the history thread once the snapshot is written.
+        """
+        with self.pending_changed:
+            self.pending[world] = (game_state, callback)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._record_loop, name="save-history", daemon=True)
+                self.worker.start()
+            self.pending_changed.notify_all()
+
+    def _record_loop(self):
+        while True:
+            with self.pending_changed:
+                self.recording = False
+                self.pending_changed.notify_all()
+                self.pending_changed.wait_for(lambda: self.pending)
+                world = next(iter(self.pending))
+                game_state, callback = self.pending.pop(world)
+                self.recording = True
+            try:
+                snapshot_id, error = self.record(world, game_state), None
+            except Exception as e:
+                snapshot_id, error = None, e
+            if callback is not None:
+                callback(snapshot_id, error)
+
+    def wait_idle(self, timeout=None):
+        """Wait until every queued snapshot is recorded; False on timeout."""
+        with self.pending_changed:
+            return self.pending_changed.wait_for(lambda: not self.pending and not self.recording, timeout)
+
+    def reconstruct(self, world, entries, snapshot_id):
+        """Rebuild the full game state of one snapshot from its chain."""
+        position = next(i for i, entry in enumerate(entries) if entry["id"] == snapshot_id)
+        start = position
+        while entries[start]["kind"] != "base":
+            start -= 1
+
+        state = _read_json_gz(self._entry_path(world, entries[start]))
+        for entry in entries[start + 1:position + 1]:
+            apply_delta(state, _read_json_gz(self._entry_path(world, entry)))
+        return state
+
+    def load(self, world, snapshot_id=None):
+        """Full game state of a snapshot (the newest if snapshot_id is None)."""
+        with self.lock:
+            entries = self.load_manifest(world)
+            if not entries:
+                raise KeyError(f"no snapshots for world '{world}'")
+            if snapshot_id is None:
+                snapshot_id = entries[-1]["id"]
+            if all(entry["id"] != snapshot_id for entry in entries):
+                raise KeyError(f"no snapshot {snapshot_id} for world '{world}'")
+            return self.reconstruct(world, entries, snapshot_id)
+
+    def list(self, world):
+        with self.lock:
+            return self.load_manifest(world)
+
+    def compact(self, world, entries):
+        """Drop snapshots the retention policy no longer keeps.
+
+        A dropped delta is merged into the snapshot after it; a dropped base
+        turns the next snapshot into a base. Caller must hold self.lock.
+        """
+        keep = self.policy.select(entries)
+        position = 0
+        changed = False
+        while position < len(entries) - 1:
+            entry = entries[position]
+            if entry["id"] in keep:
+                position += 1
+                continue
+
+            following = entries[position + 1]
+            if following["kind"] == "delta":
+                following_delta = _read_json_gz(self._entry_path(world, following))
+                if entry["kind"] == "base":
+                    data = apply_delta(_read_json_gz(self._entry_path(world, entry)), following_delta)
+                    kind = "base"
+                else:
+                    data = merge_deltas(_read_json_gz(self._entry_path(world, entry)), following_delta)
+                    kind = "delta"
+                old_path = self._entry_path(world, following)
+                following["kind"] = kind
+                following["file"] = f"{following['id']:06d}.{kind}.json.gz"
+                if kind == "delta":
+                    following["changed"] = len(data["changed"])
+                    following["removed"] = len(data["removed"])
+                else:
+                    following.pop("changed", None)
+                    following.pop("removed", None)
+                _write_json_gz(self._entry_path(world, following), data)
+                if old_path != self._entry_path(world, following):
+                    os.remove(old_path)
+
+            os.remove(self._entry_path(world, entry))
+            del entries[position]
+            changed = True
+
+        if changed:
+            self.write_manifest(world, entries)
+
+    def prune_files(self, pattern=r"^autosave_(\d{8}_\d{6})\.tms$", dry_run=False):
+        """Apply the retention policy to timestamped .tms files in saves_dir.
+
+        Returns the names of the files removed (or that would be removed).
+        """
+        matches = []
+        for name in os.listdir(self.saves_dir):
+            match = re.match(pattern, name)
+            if match:
+                saved_at = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+                matches.append({"id": name, "saved_at": saved_at.isoformat()})
+        matches.sort(key=lambda entry: entry["saved_at"])
+
+        keep = self.policy.select(matches)
+        removed = [entry["id"] for entry in matches if entry["id"] not in keep]
+        if not dry_run:
+            for name in removed:
+                os.remove(os.path.join(self.saves_dir, name))
+        return removed
+
+
+def read_save(manager, ref):
+    """Load a save given as a .tms file name/path (single-file or sharded) or as world@snapshot_id."""
+    if "@" in ref and not os.path.exists(ref):
+        world, snapshot_id = ref.rsplit("@", 1)
+        return manager.load(world, int(snapshot_id))
+
+    path = ref if os.path.exists(ref) else os.path.join(manager.saves_dir, ref)
+    manifest = read_manifest(path)
+    if manifest is not None:
+        state = {key: value for key, value in manifest.items()
+                 if key not in ("format", "version", "generation", "player_count", "sample_players", "shards")}
+        saves = ShardedSaves()
+        try:
+            state["players"] = saves.load(path, manifest)
+        finally:
+            saves.close()
+        return state
+    state = {"players": {}}
+    for kind, key, value in iter_save(path):
+        if kind == "player":
+            state["players"][key] = value
+        else:
+            state[key] = value
+    return state
+
+
+def format_diff(diff):
+    lines = []
+    for username in diff["added"]:
+        lines.append(f"+ {username} (new player)")
+    for username in diff["removed"]:
+        lines.append(f"- {username} (removed)")
+    for username, fields in diff["changed"].items():
+        lines.append(f"~ {username}")
+        for field, (before, after) in fields.items():
+            lines.append(f"    {field}: {before} -> {after}")
+    if not lines:
+        lines.append("No differences.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    manager = SaveManager()
+
+    if len(argv) == 2 and argv[0] == "list":
+        entries = manager.list(argv[1])
+        if not entries:
+            print(f"No snapshots for world '{argv[1]}'.")
+        for entry in entries:
+            size = os.path.getsize(manager._entry_path(argv[1], entry))
+            detail = f"{entry.get('changed', entry['players'])} changed" if entry["kind"] == "delta" else "full"
+            print(f"  [{entry['id']}] {entry['saved_at']}  {entry['kind']:<5}  "
+                  f"{entry['players']} players, {detail}, {size} bytes")
+    elif len(argv) == 3 and argv[0] == "diff":
+        print(format_diff(diff_states(read_save(manager, argv[1]), read_save(manager, argv[2]))))
+    elif len(argv) == 4 and argv[0] == "restore":
+        state = manager.load(argv[1], int(argv[2]))
+        with open(argv[3], 'w') as f:
+            json.dump(state, f, indent=2)
+        print(f"[OK] Snapshot {argv[2]} of '{argv[1]}' written to {argv[3]}")
+    elif argv[:1] == ["prune"] and set(argv[1:]) <= {"--dry-run"}:
+        dry_run = "--dry-run" in argv
+        removed = manager.prune_files(dry_run=dry_run)
+        verb = "Would remove" if dry_run else "Removed"
+        print(f"{verb} {len(removed)} autosave file(s) under {manager.policy}")
+        for name in removed:
+            print(f"  {name}")
+    else:
+        print(__doc__.strip())
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Streaming Save Reader
+Parses .tms save files incrementally so a large world never has to be held
+in memory as one JSON document. The "players" object is yielded one player
+at a time; every other top-level key is yielded as a whole value.
+"""
+
+import codecs
+import json
+import mmap
+import os
+import re
+
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_scan = _decoder.scan_once  # C scanner; raw_decode without the wrapper
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class SaveFormatError(Exception):
+    """Raised when a save file is not a well-formed .tms document."""
+
+
+class JsonStreamReader:
+    """A small pull parser over a file of JSON text, read in chunks."""
+
+    def __init__(self, f, chunk_size=CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def fill(self):
+        """Append the next chunk, dropping text that was already consumed."""
+        if self.eof:
+            return False
+        data = self.f.read(self.chunk_size)
+        self.bytes_read += len(data)
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return bool(data)
+
+    def offset(self):
+        """Byte offset in the file of the next unconsumed character."""
+        pending = len(self.decoder.getstate()[0])  # Bytes of a split character
+        return self.bytes_read - pending - len(self.buffer[self.pos:].encode('utf-8'))
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise SaveFormatError("unexpected end of file")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise SaveFormatError(f"expected '{char}' but found '{found}' at byte ~{self.bytes_read}")
+        self.pos += 1
+
+    def read_value(self):
+        """Decode the next complete JSON value, reading more text as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = _scan(self.buffer, self.pos)
+            except (json.JSONDecodeError, StopIteration) as e:
+                if self.eof:
+                    detail = e.msg if isinstance(e, json.JSONDecodeError) else "unexpected data"
+                    raise SaveFormatError(f"invalid JSON near byte ~{self.bytes_read}: {detail}")
+                self.fill()
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+    def next_member(self, first):
+        """Advance to the next "key": in an object; None at the closing brace."""
+        if self.peek() == '}':
+            self.pos += 1
+            return None
+        if not first:
+            self.expect(',')
+        key = self.read_value()
+        if not isinstance(key, str):
+            raise SaveFormatError("object keys must be strings")
+        self.expect(':')
+        return key
+
+
+def iter_save(path, chunk_size=CHUNK_SIZE, progress=False, boundary=None):
+    """Yield the contents of a save file incrementally.
+
+    Yields ("player", username, data) for each entry of the players object
+    and ("meta", key, value) for every other top-level key, in file order.
+    With progress=True each item also carries the fraction of the file read.
+
+    boundary, if given, is called (about once per chunk read) with the byte
+    offset just past the last player yielded so far; find_player can search
+    from such an offset. It is only called once the caller has asked for
+    the next item, i.e. has finished with every player before it.
+    """
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as f:
+        reader = JsonStreamReader(f, chunk_size)
+        for item in _iter_document(reader, boundary):
+            if progress:
+                item += (min(1.0, reader.bytes_read / size),)
+            yield item
+
+
+def _iter_document(reader, boundary=None):
+    reader.expect('{')
+    first = True
+    while True:
+        key = reader.next_member(first)
+        first = False
+        if key is None:
+            return
+        if key != "players":
+            yield "meta", key, reader.read_value()
+            continue
+
+        reader.expect('{')
+        yield from _iter_players(reader, True, boundary)
+
+
+def _iter_players(reader, first, boundary=None):
+    """Entries of the players object, up to and including its closing brace."""
+    marked = reader.bytes_read
+    while True:
+        if boundary is not None and not first and reader.bytes_read != marked:
+            marked = reader.bytes_read
+            boundary(reader.offset())
+        username = reader.next_member(first)
+        first = False
+        if username is None:
+            return
+        yield "player", username, reader.read_value()
+
+
+def _mentions(path, username, start):
+    """False if username cannot be a key anywhere in the file past start.
+
+    A plain byte search for the name as json writes it (escaped and not),
+    far cheaper than parsing; rules out most names that are not in a save,
+    such as new players logging in.
+    """
+    keys = {json.dumps(username).encode('utf-8'), json.dumps(username, ensure_ascii=False).encode('utf-8')}
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return True  # Let the parser report it
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return any(data.find(key, start) != -1 for key in keys)
+
+
+def find_player(path, username, start=0, chunk_size=CHUNK_SIZE):
+    """Scan a save file for one player's data; None if they are not in it.
+
+    With a start offset from iter_save's boundary callback, only the
+    players after that point are searched.
+    """
+    if not _mentions(path, username, start):
+        return None
+    with open(path, 'rb') as f:
+        reader = JsonStreamReader(f, chunk_size)
+        if start:
+            f.seek(start)
+            items = _iter_players(reader, False)
+        else:
+            items = _iter_document(reader)
+        for kind, key, value in items:
+            if kind == "player" and key == username:
+                return value
+    return None
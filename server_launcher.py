@@ -8,6 +8,10 @@ import os
 import sys
 from datetime import datetime
 from game_server import GameServer
+from game_log import GameLogger
+from rate_limit import parse_limits
+from save_stream import iter_save
+from sharded_save import read_manifest
 
 
 def get_save_files():
@@ -24,21 +28,38 @@ def get_save_files():
 
 def display_save_file_info(filename):
     """Display information about a save file."""
-    import json
-    
     save_path = os.path.join("saves", filename)
     try:
-        with open(save_path, 'r') as f:
-            data = json.load(f)
+        # A sharded save's manifest already has the counts; no shard is read
+        manifest = read_manifest(save_path)
+        if manifest is not None:
+            players = manifest.get("sample_players", [])
+            player_count = manifest.get("player_count", 0)
+            player_preview = ", ".join(players)
+            if player_count > len(players):
+                player_preview += f" (+{player_count - len(players)} more)"
+            return {
+                "saved_at": manifest.get("saved_at", "Unknown"),
+                "player_count": player_count,
+                "players": player_preview if players else "None"
+            }
         
-        saved_at = data.get("saved_at", "Unknown")
-        player_count = len(data.get("players", {}))
+        # Stream the file so large worlds are never held in memory at once
+        saved_at = "Unknown"
+        players = []
+        player_count = 0
+        for kind, key, value in iter_save(save_path):
+            if kind == "player":
+                player_count += 1
+                if len(players) < 3:
+                    players.append(key)
+            elif key == "saved_at":
+                saved_at = value
         
         # Get player names
-        players = list(data.get("players", {}).keys())
-        player_preview = ", ".join(players[:3])
-        if len(players) > 3:
-            player_preview += f" (+{len(players) - 3} more)"
+        player_preview = ", ".join(players)
+        if player_count > 3:
+            player_preview += f" (+{player_count - 3} more)"
         
         return {
             "saved_at": saved_at,
@@ -121,9 +142,35 @@ def main():
     print("="*70)
     print()
     
+    # Optional settings from the environment
+    admins = [name.strip() for name in os.environ.get("TMGAME_ADMINS", "").split(",") if name.strip()]
+    world_file = os.environ.get("TMGAME_WORLD") or None
+    
     # Start the server
     try:
-        server = GameServer(host='0.0.0.0', port=5555, save_file=save_file)
+        log = GameLogger(path=os.environ.get("TMGAME_LOG") or None,
+                         level=os.environ.get("TMGAME_LOG_LEVEL", "info"),
+                         json_lines=os.environ.get("TMGAME_LOG_JSON") == "1")
+        server = GameServer(host='0.0.0.0', port=5555, save_file=save_file,
+                            world_file=world_file, admins=admins, log=log)
+        for setting, variable in (("max_connections", "TMGAME_MAX_CONNECTIONS"),
+                                  ("max_connections_per_ip", "TMGAME_MAX_PER_IP"),
+                                  ("login_timeout", "TMGAME_LOGIN_TIMEOUT"),
+                                  ("idle_timeout", "TMGAME_IDLE_TIMEOUT"),
+                                  ("rate_limit_strikes", "TMGAME_RATE_STRIKES"),
+                                  ("save_shards", "TMGAME_SAVE_SHARDS")):
+            if os.environ.get(variable):
+                setattr(server, setting, int(os.environ[variable]))
+        if os.environ.get("TMGAME_RATE_LIMITS") == "off":
+            server.rate_limits = {}
+        elif os.environ.get("TMGAME_RATE_LIMITS"):
+            server.rate_limits = parse_limits(os.environ["TMGAME_RATE_LIMITS"])
+        if os.environ.get("TMGAME_SAVE_WORKERS"):
+            server.sharded_saves.workers = int(os.environ["TMGAME_SAVE_WORKERS"])
+        if os.environ.get("TMGAME_STATUS_PORT"):
+            server.status_port = int(os.environ["TMGAME_STATUS_PORT"])
+        if os.environ.get("TMGAME_RECORD"):
+            server.start_recording(os.environ["TMGAME_RECORD"])
         server.start()
     except KeyboardInterrupt:
         print("\nServer interrupted by user.")
@@ -0,0 +1,195 @@
+"""
+Sharded Saves
+Writes a world as a small manifest plus N shard files instead of one large
+JSON document. Players are partitioned by a hash of their username, so
+shards are independent: a process pool serializes (and later parses) them
+in parallel, and one player can be looked up by reading a single shard.
+
+Layout for saves/my_world.tms:
+
+    saves/my_world.tms                    manifest (still the file the launcher lists)
+    saves/my_world.shards/000007-000.json shard 0 of save generation 7
+    saves/my_world.shards/000007-001.json ...
+
+The manifest holds the save's metadata (saved_at, server_info, ...), the
+player count and the shard list. Each shard is {"shard": i, "players": {...}},
+a valid .tms document on its own. A save writes a new generation of shards,
+then atomically replaces the manifest and removes the previous generation,
+so a crash at any point leaves the last complete save readable.
+"""
+
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+
+from save_stream import find_player, iter_save
+
+
+MANIFEST_FORMAT = "tms-sharded"
+FORMAT_VERSION = 1
+
+
+def shard_of(username, shard_count):
+    """Shard number of a player (stable across runs and machines)."""
+    return zlib.crc32(username.encode('utf-8')) % shard_count
+
+
+def shard_dir(save_path):
+    return os.path.splitext(save_path)[0] + ".shards"
+
+
+def read_manifest(save_path):
+    """The manifest of a sharded save, or None for a single-file save.
+
+    Manifests are written with "format" as their first key, so a
+    single-file save is recognised without reading past its first value.
+    """
+    items = iter_save(save_path)
+    try:
+        first = next(items, None)
+    finally:
+        items.close()
+    if first is None or first[:2] != ("meta", "format") or first[2] != MANIFEST_FORMAT:
+        return None
+    with open(save_path) as f:
+        manifest = json.load(f)
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{save_path}: unsupported sharded save version {manifest.get('version')}")
+    return manifest
+
+
+def remove_shards(save_path, keep=()):
+    """Delete a save's shard files, except those named in keep."""
+    directory = shard_dir(save_path)
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name not in keep:
+            os.remove(os.path.join(directory, name))
+    if not keep:
+        os.rmdir(directory)
+
+
+# Run in worker processes; must stay module-level so they can be pickled
+
+def write_shard(path, shard, players):
+    """Write one shard file atomically; returns its size in bytes."""
+    # One dumps call: a shard fits in memory, and it is several times
+    # faster than json.dump streaming small chunks to the file
+    data = json.dumps({"shard": shard, "players": players}, separators=(',', ':'))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def read_shard(path):
+    """Players of one shard file."""
+    with open(path) as f:
+        return json.load(f)["players"]
+
+
+class ShardedSaves:
+    """Saves and loads sharded worlds, in parallel when they are big enough.
+
+    Small worlds are handled in the calling thread; from parallel_threshold
+    players on, shards go to a process pool that is started on first use
+    and kept for later saves.
+    """
+
+    def __init__(self, workers=None, parallel_threshold=20000):
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.pool = None
+        self.lock = threading.Lock()  # One save at a time, so generations never collide
+
+    def executor(self):
+        if self.pool is None:
+            # spawn: forking a process full of threads and locks is unsafe
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    def parallel(self, player_count, shard_count):
+        return shard_count > 1 and self.workers > 1 and player_count >= self.parallel_threshold
+
+    def save(self, save_path, game_state, shards=8):
+        """Write game_state ({"players": {...}, other metadata}) as a sharded save.
+
+        Returns the manifest that was written.
+        """
+        with self.lock:
+            return self._save(save_path, game_state, shards)
+
+    def _save(self, save_path, game_state, shards):
+        players = game_state["players"]
+        try:
+            previous = read_manifest(save_path) if os.path.exists(save_path) else None
+        except (OSError, ValueError):
+            previous = None
+        generation = previous["generation"] + 1 if previous else 1
+
+        buckets = [{} for _ in range(shards)]
+        for username, player in players.items():
+            buckets[shard_of(username, shards)][username] = player
+
+        directory = shard_dir(save_path)
+        os.makedirs(directory, exist_ok=True)
+        names = [f"{generation:06d}-{shard:03d}.json" for shard in range(shards)]
+        paths = [os.path.join(directory, name) for name in names]
+        if self.parallel(len(players), shards):
+            sizes = list(self.executor().map(write_shard, paths, range(shards), buckets))
+        else:
+            sizes = [write_shard(path, shard, bucket) for shard, (path, bucket) in enumerate(zip(paths, buckets))]
+
+        manifest = {"format": MANIFEST_FORMAT, "version": FORMAT_VERSION, "generation": generation}
+        manifest.update((key, value) for key, value in game_state.items() if key != "players")
+        manifest["player_count"] = len(players)
+        manifest["sample_players"] = list(players)[:3]
+        manifest["shards"] = [{"file": os.path.join(os.path.basename(directory), name),
+                               "players": len(bucket), "bytes": size}
+                              for name, bucket, size in zip(names, buckets, sizes)]
+        tmp_path = save_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, save_path)
+
+        # Only now is the previous generation unreachable
+        remove_shards(save_path, keep=set(names))
+        return manifest
+
+    def shard_paths(self, save_path, manifest):
+        base = os.path.dirname(save_path)
+        return [os.path.join(base, shard["file"]) for shard in manifest["shards"]]
+
+    def iter_shards(self, save_path, manifest):
+        """Yield the players dict of each shard, as shards finish loading."""
+        paths = self.shard_paths(save_path, manifest)
+        if not self.parallel(manifest["player_count"], len(paths)):
+            for path in paths:
+                yield read_shard(path)
+            return
+        futures = [self.executor().submit(read_shard, path) for path in paths]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+    def load(self, save_path, manifest):
+        """Every player of a sharded save as one {username: data} dict."""
+        players = {}
+        for shard_players in self.iter_shards(save_path, manifest):
+            players.update(shard_players)
+        return players
+
+    def find_player(self, save_path, manifest, username):
+        """One player's data, reading only their shard; None if absent."""
+        paths = self.shard_paths(save_path, manifest)
+        return find_player(paths[shard_of(username, len(paths))], username)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -0,0 +1,215 @@
+"""
+Spectator Module
+Read-only observers of the realm. A client that logs in with "@spectate" is
+handed to the SpectatorHub, which serves every spectator from one thread:
+
+- public events (joins, fights, global and room chat) are queued by the game
+  without blocking and fanned out in batches, encoded once per batch
+- room occupancy comes from immutable WorldSnapshot objects that the hub
+  asks the server for once per interval, no matter how many spectators are
+  watching, so observers never touch the game-state lock themselves
+
+Spectator sockets are non-blocking; one that stops reading and falls too
+far behind is disconnected instead of slowing anyone else down.
+"""
+
+import queue
+import selectors
+import socket
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+
+SPECTATE_COMMAND = "@spectate"
+
+# An immutable view of the world at one moment. rooms is a tuple of
+# (location_id, location_name, (username, ...)) for occupied locations.
+WorldSnapshot = namedtuple("WorldSnapshot", "taken_at players_online rooms")
+
+SPECTATOR_HELP = "[SPECTATE] Commands: look (who is where), help, quit\n"
+
+
+def render_snapshot(snapshot):
+    """Text shown to spectators for a snapshot."""
+    taken_at = datetime.fromtimestamp(snapshot.taken_at).strftime("%H:%M:%S")
+    msg = f"\n{'='*60}\n"
+    msg += f"THE REALM - {snapshot.players_online} player(s) online (as of {taken_at})\n"
+    msg += f"{'='*60}\n"
+    for _, name, usernames in snapshot.rooms:
+        msg += f"  {name} ({len(usernames)}): {', '.join(usernames)}\n"
+    if not snapshot.rooms:
+        msg += "  Nobody is adventuring right now.\n"
+    msg += f"{'='*60}\n"
+    return msg
+
+
+class Spectator:
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.outgoing = bytearray()
+        self.incoming = b""
+
+
+class SpectatorHub:
+    """Owns every spectator connection and the thread that serves them."""
+
+    def __init__(self, snapshot_source, metrics, snapshot_interval=2.0, tick=0.1,
+                 max_spectators=500, max_backlog=256 * 1024, queue_size=10000):
+        self.snapshot_source = snapshot_source  # Callable returning a WorldSnapshot
+        self.metrics = metrics
+        self.snapshot_interval = snapshot_interval
+        self.tick = tick
+        self.max_spectators = max_spectators
+        self.max_backlog = max_backlog
+        self.events = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()  # Guards pending and thread start-up only
+        self.pending = []  # Spectators handed over but not yet registered
+        self.spectators = {}  # {socket: Spectator}, touched only by the hub thread
+        self.snapshot = None
+        self.selector = None
+        self.thread = None
+
+    def __len__(self):
+        return len(self.spectators) + len(self.pending)
+
+    def sockets(self):
+        """Every spectator socket (for memory accounting)."""
+        with self.lock:
+            return list(self.spectators) + [spectator.sock for spectator in self.pending]
+
+    def add(self, sock, address):
+        """Take over a connection. Returns False (and leaves it alone) if full."""
+        with self.lock:
+            if len(self) >= self.max_spectators:
+                self.metrics.increment("spectators_rejected")
+                return False
+            self.pending.append(Spectator(sock, address))
+            if self.thread is None:
+                self.selector = selectors.DefaultSelector()
+                self.thread = threading.Thread(target=self.run, name="spectator-hub")
+                self.thread.daemon = True
+                self.thread.start()
+        self.metrics.increment("spectators_joined")
+        return True
+
+    def publish(self, text):
+        """Queue a public event for spectators; never blocks the caller."""
+        if not self.spectators and not self.pending:
+            return
+        try:
+            self.events.put_nowait(text)
+        except queue.Full:
+            self.metrics.increment("spectator_events_dropped")
+
+    # Hub thread -------------------------------------------------------------
+
+    def run(self):
+        next_snapshot = 0.0
+        while True:
+            self.register_pending()
+
+            now = time.monotonic()
+            if now >= next_snapshot and self.spectators:
+                next_snapshot = now + self.snapshot_interval
+                snapshot = self.snapshot_source()
+                if self.snapshot is None or snapshot[1:] != self.snapshot[1:]:
+                    self.snapshot = snapshot
+                    self.send_all(render_snapshot(snapshot).encode('utf-8'))
+                else:
+                    self.snapshot = snapshot
+
+            batch = []
+            while True:
+                try:
+                    batch.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+            if batch and self.spectators:
+                self.send_all(''.join(batch).encode('utf-8'))
+
+            for key, mask in self.selector.select(timeout=self.tick if self.spectators else 0.5):
+                spectator = self.spectators.get(key.fileobj)
+                if spectator is None:
+                    continue
+                if mask & selectors.EVENT_READ:
+                    self.read(spectator)
+                if mask & selectors.EVENT_WRITE and spectator.sock in self.spectators:
+                    self.flush(spectator)
+
+    def register_pending(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for spectator in pending:
+            spectator.sock.setblocking(False)
+            self.spectators[spectator.sock] = spectator
+            self.selector.register(spectator.sock, selectors.EVENT_READ)
+            if self.snapshot is None:
+                self.snapshot = self.snapshot_source()
+            self.send(spectator, ("[SPECTATE] You are watching the realm.\n" + SPECTATOR_HELP +
+                                  render_snapshot(self.snapshot)).encode('utf-8'))
+
+    def send_all(self, payload):
+        for spectator in list(self.spectators.values()):
+            self.send(spectator, payload)
+
+    def send(self, spectator, payload):
+        spectator.outgoing += payload
+        if len(spectator.outgoing) > self.max_backlog:
+            self.metrics.increment("spectators_dropped_slow")
+            self.drop(spectator)
+            return
+        self.flush(spectator)
+
+    def flush(self, spectator):
+        try:
+            sent = spectator.sock.send(spectator.outgoing)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self.drop(spectator)
+            return
+        del spectator.outgoing[:sent]
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if spectator.outgoing else 0)
+        self.selector.modify(spectator.sock, events)
+
+    def read(self, spectator):
+        try:
+            data = spectator.sock.recv(4096)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(spectator)
+            return
+
+        spectator.incoming += data
+        while b"\n" in spectator.incoming:
+            line, spectator.incoming = spectator.incoming.split(b"\n", 1)
+            command = line.decode('utf-8', errors='replace').strip().lower()
+            if command in ("quit", "exit"):
+                self.send(spectator, b"Goodbye!\n")
+                self.drop(spectator)
+                return
+            if command in ("look", "l", "players"):
+                self.send(spectator, render_snapshot(self.snapshot).encode('utf-8'))
+            elif command:
+                self.send(spectator, SPECTATOR_HELP.encode('utf-8'))
+        if len(spectator.incoming) > 4096:
+            spectator.incoming = b""
+
+    def drop(self, spectator):
+        if self.spectators.pop(spectator.sock, None) is None:
+            return
+        try:
+            self.selector.unregister(spectator.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            spectator.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        spectator.sock.close()
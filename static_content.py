@@ -0,0 +1,81 @@
+"""
+Static Content Module
+Blocks of output that are the same for every player until the world data
+changes: the help menu, each help category and the shop listing. Every
+block is rendered and encoded once per world and identified by a hash of
+its text.
+
+A client that keeps a local copy of these blocks says so at login with an
+"@cache" line listing the versions it already holds:
+
+    @cache help=3f2a9c01d4e5b6a7 shop=0b1c2d3e4f5a6b7c
+
+From then on that connection is sent either the whole block, framed so the
+client can store it,
+
+    @@block <key> <hash> <line count>
+    <the block's lines>
+
+or, once the client holds the current version, only a reference to it:
+
+    @@cached <key> <hash>
+
+Connections that never sent "@cache" get the plain text as before.
+"""
+
+import hashlib
+from collections import namedtuple
+
+
+CACHE_COMMAND = "@cache"
+
+# One pre-rendered block and each of the ways it can be sent, as text (for
+# batched output) and already encoded
+StaticBlock = namedtuple("StaticBlock", "key digest text payload framed framed_payload "
+                                        "reference reference_payload")
+
+
+def content_hash(text):
+    """The hash identifying one version of a block."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+def make_block(key, text):
+    if not text.endswith("\n"):
+        text += "\n"
+    digest = content_hash(text)
+    lines = text.count("\n")
+    framed = f"@@block {key} {digest} {lines}\n{text}"
+    reference = f"@@cached {key} {digest}\n"
+    return StaticBlock(key, digest, text, text.encode('utf-8'), framed, framed.encode('utf-8'),
+                       reference, reference.encode('utf-8'))
+
+
+def parse_announcement(line, known_keys):
+    """{key: hash} from an "@cache key=hash ..." line, ignoring unknown keys."""
+    held = {}
+    for entry in line[len(CACHE_COMMAND):].split():
+        key, _, digest = entry.partition("=")
+        if key in known_keys and digest:
+            held[key] = digest
+    return held
+
+
+class StaticContent:
+    """The current version of every static block."""
+
+    def __init__(self, texts):
+        self.set_texts(texts)
+
+    def set_texts(self, texts):
+        """Replace every block from a {key: text} dict (e.g. after a world reload)."""
+        self.blocks = {key: make_block(key, text) for key, text in texts.items()}
+
+    def get(self, key):
+        return self.blocks[key]
+
+    def __contains__(self, key):
+        return key in self.blocks
+
+    def __len__(self):
+        return len(self.blocks)
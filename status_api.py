@@ -0,0 +1,112 @@
+"""
+Status API Module
+A small local HTTP endpoint for monitoring. Responses are JSON documents
+taken from a summary the server builds at most once per interval and
+encodes once, so any number of pollers costs one summary per interval and
+nothing per request on the game side.
+
+Endpoints:
+    GET /status    everything below in one document
+    GET /players   online players
+    GET /rooms     occupancy per location
+    GET /metrics   uptime, connection counts, last save and counters
+    GET /health    "ok" (does not touch the summary)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+SECTIONS = {
+    "/players": ("generated_at", "players_online", "players"),
+    "/rooms": ("generated_at", "rooms"),
+    "/metrics": ("generated_at", "uptime_seconds", "connections", "spectators",
+                 "total_players", "last_save", "world", "metrics"),
+}
+
+
+class StatusCache:
+    """Encoded responses for every endpoint, rebuilt at most once per interval."""
+
+    def __init__(self, summary_source, interval=1.0, clock=time.monotonic):
+        self.summary_source = summary_source  # Callable returning the summary dict
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.built_at = None
+        self.responses = {}
+        self.rebuilds = 0
+
+    def get(self, path):
+        """Encoded JSON for path, or None if there is no such endpoint."""
+        with self.lock:
+            now = self.clock()
+            if self.built_at is None or now - self.built_at >= self.interval:
+                self.rebuild()
+                self.built_at = now
+            return self.responses.get(path)
+
+    def rebuild(self):
+        summary = self.summary_source()
+        responses = {"/status": summary}
+        for path, keys in SECTIONS.items():
+            responses[path] = {key: summary[key] for key in keys}
+        self.responses = {path: json.dumps(body, indent=2).encode('utf-8') + b"\n"
+                          for path, body in responses.items()}
+        self.responses["/"] = self.responses["/status"]
+        self.rebuilds += 1
+
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    server_version = "TMGameStatus/1.0"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/") or "/"
+        if path == "/health":
+            self.respond(200, b"ok\n", "text/plain")
+            return
+        body = self.server.cache.get(path)
+        if body is None:
+            self.respond(404, b'{"error": "not found"}\n', "application/json")
+        else:
+            self.respond(200, body, "application/json")
+
+    def respond(self, status, body, content_type):
+        self.server.metrics.increment("status_requests")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Pollers would flood the server log
+
+
+class StatusServer:
+    """Runs the HTTP endpoint on its own threads."""
+
+    def __init__(self, summary_source, metrics, host="127.0.0.1", port=5556, interval=1.0):
+        self.cache = StatusCache(summary_source, interval)
+        self.httpd = ThreadingHTTPServer((host, port), StatusRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.cache = self.cache
+        self.httpd.metrics = metrics
+        self.thread = None
+
+    @property
+    def address(self):
+        return self.httpd.server_address
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="status-api")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,265 @@
+"""
+World Loader Module
+Loads game content (locations, enemies, items) from game_data.py or a JSON
+data file, validates it and compiles it into a World the server can swap in
+atomically.
+"""
+
+import copy
+import hashlib
+import importlib
+import json
+import sys
+
+import game_data
+
+
+DIRECTIONS = ("north", "south", "east", "west")
+
+SECTIONS = ("locations", "enemies", "weapons", "spells", "starting_stats")
+
+REQUIRED_FIELDS = {
+    "locations": {"name": str, "description": str, "exits": dict, "enemies": list},
+    "enemies": {"name": str, "health": int, "damage": int, "exp_reward": int, "gold_reward": int},
+    "weapons": {"name": str, "damage": int, "cost": int},
+    "spells": {"name": str, "damage": int, "mana_cost": int, "cost": int},
+    "starting_stats": {"health": int, "max_health": int, "mana": int, "max_mana": int, "level": int,
+                       "exp": int, "exp_to_level": int, "gold": int, "location": str, "weapon": str,
+                       "spells": list, "inventory": list},
+}
+
+
+class WorldError(Exception):
+    """Raised when world data fails validation."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__(f"{len(self.errors)} world data error(s): " + "; ".join(self.errors))
+
+
+class World:
+    """A validated, compiled snapshot of the game content.
+
+    Handlers should grab ``server.world`` once and use that object for the
+    whole command, so a hot reload never mixes data from two worlds.
+    """
+
+    def __init__(self, locations, enemies, weapons, spells, starting_stats, source, digest, warnings):
+        self.locations = locations
+        self.enemies = enemies
+        self.weapons = weapons
+        self.spells = spells
+        self.starting_stats = starting_stats
+        self.source = source
+        self.digest = digest
+        self.warnings = warnings
+        self.next_hops = _build_route_table(locations)
+        self.location_aliases = _build_location_aliases(locations)
+
+    def new_player(self):
+        """Return fresh stats for a new character."""
+        return copy.deepcopy(self.starting_stats)
+
+    def find_location(self, query):
+        """Resolve a location id or display name (any case) to its id."""
+        return self.location_aliases.get(_alias_key(query))
+
+    def route(self, source, target):
+        """Return the directions of a shortest path, or None if unreachable."""
+        hops = self.next_hops.get(source, {})
+        if target != source and target not in hops:
+            return None
+        directions = []
+        while source != target:
+            direction = hops[target]
+            directions.append(direction)
+            source = self.locations[source]["exits"][direction]
+            hops = self.next_hops[source]
+        return directions
+
+
+def _intern_ids(section, mapping, errors):
+    """mapping with its ids interned; ids that are not strings are reported."""
+    interned = {}
+    for key, value in mapping.items():
+        if isinstance(key, str):
+            interned[sys.intern(key)] = value
+        else:
+            errors.append(f"{section}: id {key!r} is not a string")
+    return interned
+
+
+def _check_entry(label, entry, fields, errors):
+    """Check that entry has each field with the expected type."""
+    for field, expected in fields.items():
+        if field not in entry:
+            errors.append(f"{label}: missing '{field}'")
+        elif not isinstance(entry[field], expected) or isinstance(entry[field], bool):
+            errors.append(f"{label}.{field}: expected {expected.__name__}")
+
+
+def _check_fields(section, entries, errors):
+    for entry_id, entry in entries.items():
+        if not isinstance(entry, dict):
+            errors.append(f"{section}.{entry_id}: expected an object")
+            continue
+        _check_entry(f"{section}.{entry_id}", entry, REQUIRED_FIELDS[section], errors)
+        if section != "locations":
+            continue
+        # Ids are used as dict keys and interned, so they must be strings.
+        # A wrong exits/enemies type was reported above; skip its items.
+        exits = entry.get("exits")
+        if isinstance(exits, dict):
+            for direction, target in exits.items():
+                if not isinstance(direction, str) or not isinstance(target, str):
+                    errors.append(f"{section}.{entry_id}.exits: expected direction and location id strings, "
+                                  f"got {direction!r}: {target!r}")
+        enemy_ids = entry.get("enemies")
+        if isinstance(enemy_ids, list):
+            for enemy_id in enemy_ids:
+                if not isinstance(enemy_id, str):
+                    errors.append(f"{section}.{entry_id}.enemies: expected enemy id strings, got {enemy_id!r}")
+
+
+def _alias_key(text):
+    return "_".join(text.lower().replace("'", "").split())
+
+
+def _build_location_aliases(locations):
+    aliases = {}
+    for loc_id, loc in locations.items():
+        aliases.setdefault(_alias_key(loc["name"]), loc_id)
+    # Ids win over display names if the two ever collide
+    aliases.update({_alias_key(loc_id): loc_id for loc_id in locations})
+    return aliases
+
+
+def _build_route_table(locations):
+    """All-pairs shortest paths as next hops: table[src][dst] = direction.
+
+    One breadth-first search per location; exits are unweighted, so BFS
+    order gives shortest routes, ties broken by exit order.
+    """
+    table = {}
+    for source in locations:
+        hops = {}
+        frontier = []
+        for direction, target in locations[source]["exits"].items():
+            if target != source and target not in hops:
+                hops[target] = direction
+                frontier.append(target)
+        for node in frontier:  # frontier grows while we iterate: BFS queue
+            for target in locations[node]["exits"].values():
+                if target != source and target not in hops:
+                    hops[target] = hops[node]
+                    frontier.append(target)
+        table[source] = hops
+    return table
+
+
+def _unreachable(locations, start):
+    seen = {start}
+    frontier = [start]
+    while frontier:
+        for target in locations[frontier.pop()]["exits"].values():
+            if target not in seen:
+                seen.add(target)
+                frontier.append(target)
+    return sorted(set(locations) - seen)
+
+
+def compile_world(data, source="<memory>"):
+    """Validate raw world data and compile it into a World.
+
+    Raises WorldError listing every problem found, so a broken data file
+    is rejected as a whole instead of failing later inside a command.
+    """
+    errors = []
+    for section in SECTIONS:
+        if not isinstance(data.get(section), dict):
+            errors.append(f"missing or invalid section '{section}'")
+    if errors:
+        raise WorldError(errors)
+
+    # Compile from a private copy so later edits to the source never leak in
+    data = copy.deepcopy({section: data[section] for section in SECTIONS})
+    locations = _intern_ids("locations", data["locations"], errors)
+    enemies = _intern_ids("enemies", data["enemies"], errors)
+    weapons = _intern_ids("weapons", data["weapons"], errors)
+    spells = _intern_ids("spells", data["spells"], errors)
+    starting_stats = data["starting_stats"]
+
+    for section, entries in (("locations", locations), ("enemies", enemies),
+                             ("weapons", weapons), ("spells", spells)):
+        _check_fields(section, entries, errors)
+    _check_entry("starting_stats", starting_stats, REQUIRED_FIELDS["starting_stats"], errors)
+    if errors:
+        raise WorldError(errors)
+
+    # Exit graph and cross references
+    for loc_id, loc in locations.items():
+        exits = {}
+        for direction, target in loc["exits"].items():
+            if direction not in DIRECTIONS:
+                errors.append(f"locations.{loc_id}: unknown exit direction '{direction}'")
+            if target not in locations:
+                errors.append(f"locations.{loc_id}: exit '{direction}' leads to missing location '{target}'")
+            exits[sys.intern(direction)] = sys.intern(target)
+        loc["exits"] = exits
+        for enemy_id in loc["enemies"]:
+            if enemy_id not in enemies:
+                errors.append(f"locations.{loc_id}: unknown enemy '{enemy_id}'")
+        loc["enemies"] = [sys.intern(enemy_id) for enemy_id in loc["enemies"]]
+    for enemy_id, enemy in enemies.items():
+        respawn = enemy.get("respawn_seconds")
+        if respawn is not None and (not isinstance(respawn, int) or respawn <= 0):
+            errors.append(f"enemies.{enemy_id}: respawn_seconds must be a positive integer")
+
+    # Field types of starting_stats were checked above
+    start = starting_stats["location"]
+    if start not in locations:
+        errors.append(f"starting_stats: unknown location '{start}'")
+    weapon = starting_stats["weapon"]
+    if weapon not in weapons:
+        errors.append(f"starting_stats: unknown weapon '{weapon}'")
+    for spell_id in starting_stats["spells"]:
+        if not isinstance(spell_id, str) or spell_id not in spells:
+            errors.append(f"starting_stats: unknown spell '{spell_id}'")
+    if errors:
+        raise WorldError(errors)
+
+    starting_stats["location"] = sys.intern(start)
+    warnings = [f"locations.{loc_id}: unreachable from '{start}'"
+                for loc_id in _unreachable(locations, start)]
+
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return World(locations, enemies, weapons, spells, starting_stats, source, digest, warnings)
+
+
+def load_world(path=None):
+    """Load and compile the world.
+
+    With no path the game_data module is (re)imported, so edits to
+    game_data.py are picked up by a reload. Otherwise path is a JSON file
+    with the top-level keys locations, enemies, weapons, spells and
+    starting_stats.
+    """
+    if path is None:
+        module = importlib.reload(game_data)
+        data = {
+            "locations": module.LOCATIONS,
+            "enemies": module.ENEMIES,
+            "weapons": module.WEAPONS,
+            "spells": module.SPELLS,
+            "starting_stats": module.STARTING_STATS,
+        }
+        return compile_world(data, source="game_data.py")
+
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise WorldError([f"could not read {path}: {e}"])
+    if not isinstance(data, dict):
+        raise WorldError([f"{path}: top level must be an object"])
+    return compile_world(data, source=path)